@@ -0,0 +1,494 @@
+import argparse
+import json
+import math
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import nullcontext, redirect_stdout
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+from babel.dates import format_date
+from num2words import num2words
+from openpyxl import Workbook, load_workbook
+from openpyxl.utils.cell import coordinate_to_tuple
+from schemas import ChecksDefault, CheckRecord, AdditionalInfo, TypeCheck, TypeDocument
+from utils import (
+    get_absolute_path, convert_num_to_word, create_kopecks_str, format_locale_date, get_locale, get_date_pattern,
+    create_check, validate_check
+)
+from validation import CHECK_COLUMNS, select_columns, validate_rows
+from xlsx_stream import RowSpool
+from renderers import NullRenderer
+from main import fill_report, save_report, build_additional_report, parse_checks, process_workbook
+from config import (
+    LOCATE_DATE,
+    START_ROW_READ, HEADER_ROW,
+    EMPLOYEE_CELL, POST_CELL, REPORT_MONTH_CELL, DEPARTMENT_CELL, DATE_REPORT,
+)
+
+
+def make_type_sequence(count: int, mix: Optional[Dict[TypeCheck, float]] = None, seed: int = 0) -> List[TypeCheck]:
+    """Choose the types of the synthetic checks.
+
+    Args:
+        count (int): The number of checks.
+        mix (Optional[Dict[TypeCheck, float]]): The relative weights of the types, None to take all types in turn.
+        seed (int): The seed of the random choice, the same seed gives the same checks.
+
+    Returns:
+        List[TypeCheck]: The type of every check.
+    """
+    if mix is None:
+        types = list(TypeCheck)
+        return [types[i % len(types)] for i in range(1, count + 1)]
+    return random.Random(seed).choices(list(mix), weights=list(mix.values()), k=count)
+
+
+def make_synthetic_checks(count: int, mix: Optional[Dict[TypeCheck, float]] = None, seed: int = 0) -> List[CheckRecord]:
+    """Create a list of valid checks with generated data.
+
+    Args:
+        count (int): The number of checks to create.
+        mix (Optional[Dict[TypeCheck, float]]): The relative weights of the check types, None to take all types in turn.
+        seed (int): The seed of the choice of types.
+
+    Returns:
+        List[CheckRecord]: The generated checks.
+    """
+    types = make_type_sequence(count, mix, seed)
+    documents = list(TypeDocument)
+    start = date(2025, 1, 1)
+    return [
+        CheckRecord.from_model(ChecksDefault(
+            number_str=i,
+            type_document=documents[i % len(documents)],
+            id_check=1000 + i,
+            date=start + timedelta(days=i % 365),
+            sum_check=round(100 + (i * 37.13) % 20000, 2),
+            type=types[i - 1],
+            counterparty="ООО Таблетка",
+            counterparty_participant="Иванов И.А.",
+            counterparty_post="Менеджер",
+            meeting_place="Кафе Вареник",
+            medication="Альфазокс",
+            topic="Обсуждение условий сотрудничества",
+            name_present="Ваза, Сервиз",
+            comment=None,
+        ))
+        for i in range(1, count + 1)
+    ]
+
+
+def make_synthetic_rows(count: int, mix: Optional[Dict[TypeCheck, float]] = None, seed: int = 0) -> List[tuple]:
+    """Create check rows as they are read from the input file.
+
+    Args:
+        count (int): The number of rows to create.
+        mix (Optional[Dict[TypeCheck, float]]): The relative weights of the check types, None to take all types in turn.
+        seed (int): The seed of the choice of types.
+
+    Returns:
+        List[tuple]: The generated rows of cell values.
+    """
+    return [
+        (
+            check.number_str, f"{check.type_document.value} ", check.id_check,
+            datetime.combine(check.date, datetime.min.time()), check.sum_check, check.type.value.capitalize(),
+            check.counterparty, check.counterparty_participant, check.counterparty_post, check.meeting_place,
+            check.medication, check.topic, check.name_present, check.comment, None, None,
+        )
+        for check in make_synthetic_checks(count, mix, seed)
+    ]
+
+
+def make_synthetic_info() -> AdditionalInfo:
+    """Create additional information for the synthetic report.
+
+    Returns:
+        AdditionalInfo: The generated additional information.
+    """
+    return AdditionalInfo(
+        employee="Бойко А.А.",
+        report_month=date(2025, 2, 1),
+        date_report=date(2025, 2, 21),
+        post="Региональный менеджер",
+        department="Региональное подразделение",
+    )
+
+
+def make_input_workbook(path: str, count: int, mix: Optional[Dict[TypeCheck, float]] = None, seed: int = 0) -> None:
+    """Write a synthetic input workbook in the layout read by open_input.
+
+    Args:
+        path (str): The path of the .xlsx file.
+        count (int): The number of check rows.
+        mix (Optional[Dict[TypeCheck, float]]): The relative weights of the check types, None to take all types in turn.
+        seed (int): The seed of the choice of types.
+
+    Returns:
+        None
+    """
+    info = make_synthetic_info()
+    header = [[None] * len(CHECK_COLUMNS) for _ in range(START_ROW_READ - 1)]
+    for coordinate, value in (
+        (EMPLOYEE_CELL, info.employee),
+        (POST_CELL, info.post),
+        (REPORT_MONTH_CELL, datetime.combine(info.report_month, datetime.min.time())),
+        (DEPARTMENT_CELL, info.department),
+        (DATE_REPORT, datetime.combine(info.date_report, datetime.min.time())),
+    ):
+        row, column = coordinate_to_tuple(coordinate)
+        header[row - 1][column - 1] = value
+    header[HEADER_ROW - 1] = [title for _, title in CHECK_COLUMNS]
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    for row in header:
+        sheet.append(row)
+    for row in make_synthetic_rows(count, mix, seed):
+        sheet.append(row)
+    workbook.save(path)
+
+
+def bench_report_layout(sizes: List[int]) -> None:
+    """Measure the time of laying out the AO-1 table for different numbers of checks.
+
+    Only the sheet filling is measured: template loading, saving and PDF export are excluded.
+
+    Args:
+        sizes (List[int]): The numbers of checks to measure.
+
+    Returns:
+        None
+    """
+    info = make_synthetic_info()
+    for size in sizes:
+        checks = make_synthetic_checks(size)
+        workbook = load_workbook(get_absolute_path(os.path.join("templates", "template_advance_report.xlsx")))
+
+        start = time.perf_counter()
+        fill_report(workbook.active, checks, info)
+        elapsed = time.perf_counter() - start
+
+        print(f"АО-1, чеков: {size:>6} — {elapsed:.3f} с")
+
+
+def bench_report_memory(sizes: List[int]) -> None:
+    """Compare the peak memory of writing the AO-1 report to the sheet and through the row spool.
+
+    The filling and saving of the .xlsx file are measured, the checks themselves are excluded.
+
+    Args:
+        sizes (List[int]): The numbers of checks to measure.
+
+    Returns:
+        None
+    """
+    info = make_synthetic_info()
+    template_path = get_absolute_path(os.path.join("templates", "template_advance_report.xlsx"))
+    for size in sizes:
+        checks = make_synthetic_checks(size)
+        for name, stream in (("лист", False), ("поток", True)):
+            with tempfile.TemporaryDirectory() as temp_dir:
+                workbook = load_workbook(template_path)
+                tracemalloc.start()
+                start = time.perf_counter()
+                with RowSpool(workbook.active) if stream else nullcontext() as spool:
+                    _, cached = fill_report(workbook.active, checks, info, spool)
+                    save_report(workbook, os.path.join(temp_dir, "report.xlsx"), spool, cached)
+                elapsed = time.perf_counter() - start
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+
+            print(f"АО-1 с сохранением ({name}), чеков: {size:>6} — {elapsed:.3f} с, пик памяти {peak / 2**20:.1f} МБ")
+
+
+def format_document_values(checks: List[CheckRecord], date_function: Callable[[date, str], str],
+                           words_function: Callable[[int], str], kopecks_function: Callable[[float], str]) -> None:
+    """Make the formatting calls of the additional documents of the checks.
+
+    Args:
+        checks (List[CheckRecord]): The checks to format.
+        date_function (Callable[[date, str], str]): Formats a date by a babel pattern.
+        words_function (Callable[[int], str]): Writes a number in words.
+        kopecks_function (Callable[[float], str]): Gets the kopecks of an amount.
+
+    Returns:
+        None
+    """
+    for check in checks:
+        date_compilation = check.date - timedelta(days=7)
+        for date_format in ('dd MMMM yyyy г.', 'dd', 'MMMM', 'yyyy', '«dd» MMMM yyyy г.'):
+            date_function(date_compilation, date_format)
+        date_function(check.date, 'dd MMMM yyyy г.')
+        words_function(int(check.sum_check))
+        words_function(int(math.ceil(check.sum_check / 1000) * 1000))
+        kopecks_function(check.sum_check)
+
+
+def bench_formatting(count: int) -> None:
+    """Compare the same formatting calls of the additional documents without and with the formatting cache.
+
+    Without the cache, babel and num2words are called directly; with it, the
+    cached functions of utils are called first with cleared caches and then
+    again with warm ones.
+
+    Args:
+        count (int): The number of checks to format.
+
+    Returns:
+        None
+    """
+    info = make_synthetic_info()
+    # Замеряются только чеки, для которых создаются дополнительные документы
+    checks = [check for check in make_synthetic_checks(count) if build_additional_report(check, info, "") is not None]
+
+    start = time.perf_counter()
+    format_document_values(
+        checks,
+        lambda value, date_format: format_date(value, format=date_format, locale=LOCATE_DATE),
+        lambda num: num2words(num, lang='ru').capitalize(),
+        create_kopecks_str.__wrapped__,
+    )
+    uncached = time.perf_counter() - start
+
+    cached_functions = (convert_num_to_word, create_kopecks_str, format_locale_date, get_locale, get_date_pattern)
+    for cached_function in cached_functions:
+        cached_function.cache_clear()
+    times = []
+    for _ in range(2):
+        start = time.perf_counter()
+        format_document_values(checks, format_locale_date, convert_num_to_word, create_kopecks_str)
+        times.append(time.perf_counter() - start)
+
+    print(f"Форматирование, документов: {len(checks):>6} — без кеша {uncached:.3f} с, "
+          f"с кешем: пустым {times[0]:.3f} с, заполненным {times[1]:.3f} с")
+    for cached_function in (convert_num_to_word, create_kopecks_str, format_locale_date):
+        info_cache = cached_function.cache_info()
+        print(f"  {cached_function.__name__}: попаданий {info_cache.hits}, промахов {info_cache.misses}")
+
+
+def bench_pipeline(sizes: List[int], mix: Optional[Dict[TypeCheck, float]] = None, repeat: int = 3,
+                   workers: int = 1) -> Dict[str, Dict[str, Any]]:
+    """Measure the whole processing of synthetic input workbooks, stage by stage.
+
+    Every workbook is processed with the "null" renderer, so the office backend
+    is excluded and the results are comparable on any machine. The median of
+    the repeats is taken for the time of the workbook and for the own and total
+    times of every stage.
+
+    Args:
+        sizes (List[int]): The numbers of check rows of the workbooks.
+        mix (Optional[Dict[TypeCheck, float]]): The relative weights of the check types, None to take all types in turn.
+        repeat (int): The number of runs of every workbook.
+        workers (int): The number of processes rendering additional reports.
+
+    Returns:
+        Dict[str, Dict[str, Any]]: By number of rows: {"seconds": time of the workbook,
+            "stages": {stage: {"self": own time, "total": total time}}}.
+    """
+    results = {}
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_path = os.path.join(temp_dir, "input.xlsx")
+            make_input_workbook(input_path, size, mix)
+
+            runs = []
+            with NullRenderer() as renderer:
+                for _ in range(repeat):
+                    with open(os.devnull, "w", encoding="utf-8") as devnull, redirect_stdout(devnull):
+                        result = process_workbook(input_path, os.path.join(temp_dir, "reports"), renderer, workers,
+                                                  force=True, profile=True)
+                    if result.error is not None:
+                        raise RuntimeError(result.error)
+                    runs.append(result)
+
+        stages = {}
+        for name in runs[0].profile["stages"]:
+            stages[name] = {
+                key: statistics.median(run.profile["stages"].get(name, {}).get(key, 0.0) for run in runs)
+                for key in ("self", "total")
+            }
+        results[str(size)] = {"seconds": statistics.median(run.seconds for run in runs), "stages": stages}
+
+        counters = runs[0].profile["counters"]
+        print(f"Обработка файла, строк: {size:>6} — {results[str(size)]['seconds']:.3f} с "
+              f"(чеков {counters['checks']}, документов {counters['documents']})")
+        for name, stats in stages.items():
+            print(f"  {name}: {stats['self']:.3f} с (всего {stats['total']:.3f} с)")
+    return results
+
+
+def compare_baseline(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]]) -> None:
+    """Print the change of the pipeline times against a saved baseline.
+
+    Args:
+        results (Dict[str, Dict[str, Any]]): The times returned by bench_pipeline.
+        baseline (Dict[str, Dict[str, Any]]): The times of the baseline run.
+
+    Returns:
+        None
+    """
+    def change(current: float, previous: float) -> str:
+        if previous <= 0:
+            return "нет данных"
+        return f"{(current - previous) / previous * 100:+.1f}%"
+
+    for size, result in results.items():
+        previous = baseline.get(size)
+        if previous is None:
+            print(f"Строк: {size} — нет в базовом замере")
+            continue
+        print(f"Строк: {size} — {result['seconds']:.3f} с против {previous['seconds']:.3f} с "
+              f"({change(result['seconds'], previous['seconds'])})")
+        for name, stats in result["stages"].items():
+            before = previous["stages"].get(name, {}).get("total", 0.0)
+            print(f"  {name}: {stats['total']:.3f} с против {before:.3f} с ({change(stats['total'], before)})")
+
+
+def parse_mix(values: List[str]) -> Dict[TypeCheck, float]:
+    """Parse the mix of check types given on the command line.
+
+    Args:
+        values (List[str]): Items "name=weight", where name is a member of TypeCheck (e.g., "chancellery=2").
+
+    Returns:
+        Dict[TypeCheck, float]: The weights of the types.
+
+    Raises:
+        argparse.ArgumentTypeError: If an item is not in the "name=weight" form or the type is unknown.
+    """
+    mix = {}
+    for value in values:
+        name, _, weight = value.partition("=")
+        if name not in TypeCheck.__members__ or not weight:
+            raise argparse.ArgumentTypeError(f"Неверный тип чека: {value}")
+        mix[TypeCheck[name]] = float(weight)
+    return mix
+
+
+def bench_startup(repeat: int = 5) -> None:
+    """Measure the start of the script the way a macro runs it: a new process without arguments.
+
+    The time to the first line of output and to the end of the process are
+    measured; the median of the repeats is printed.
+
+    Args:
+        repeat (int): The number of starts.
+
+    Returns:
+        None
+    """
+    script = get_absolute_path("main.py")
+    env = dict(os.environ, PYTHONUNBUFFERED="1", PYTHONIOENCODING="utf-8")
+    first_output = []
+    total = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with subprocess.Popen([sys.executable, script], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                              env=env) as process:
+            process.stdout.readline()
+            first_output.append(time.perf_counter() - start)
+            process.communicate()
+        total.append(time.perf_counter() - start)
+
+    print(f"Запуск скрипта — первый вывод через {statistics.median(first_output):.3f} с, "
+          f"завершение через {statistics.median(total):.3f} с")
+
+
+def read_models(rows: List[tuple]) -> List[ChecksDefault]:
+    """Build and validate a pydantic model for every row, the way checks were read before CheckRecord."""
+    checks = []
+    for row in rows:
+        check = create_check(row)
+        if check:
+            validate_check(check)
+            checks.append(check)
+    return checks
+
+
+def read_records(rows: List[tuple]) -> List[CheckRecord]:
+    """Validate the rows by columns and build slotted records, the way the pipeline reads checks."""
+    return list(parse_checks(validate_rows(select_columns(rows, tuple(range(len(CHECK_COLUMNS)))), [])))
+
+
+def bench_check_records(count: int) -> None:
+    """Compare reading rows into pydantic models and into slotted records.
+
+    Both the speed and the memory kept per check are measured.
+
+    Args:
+        count (int): The number of rows to read.
+
+    Returns:
+        None
+    """
+    rows = make_synthetic_rows(count)
+    for name, read in (("ChecksDefault (pydantic)", read_models), ("CheckRecord (__slots__)", read_records)):
+        start = time.perf_counter()
+        read(rows)
+        elapsed = time.perf_counter() - start
+
+        tracemalloc.start()
+        checks = read(rows)
+        memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del checks
+
+        print(f"{name}: {count / elapsed:,.0f} строк/с, {memory / count:.0f} байт на чек")
+
+
+BENCHES = ("startup", "layout", "memory", "formatting", "records", "pipeline")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Замеры производительности создания отчетов")
+    parser.add_argument("benches", nargs="*", choices=BENCHES, default=list(BENCHES),
+                        help="Замеры для запуска (по умолчанию все)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 10000],
+                        help="Количество чеков для замера таблицы АО-1")
+    parser.add_argument("--format-count", type=int, default=10000,
+                        help="Количество чеков для замера форматирования сумм и дат")
+    parser.add_argument("--rows", type=int, default=100000,
+                        help="Количество строк для замера чтения чеков")
+    parser.add_argument("--pipeline-sizes", type=int, nargs="+", default=[100, 1000],
+                        help="Количество строк синтетических входных файлов для замера всей обработки")
+    parser.add_argument("--mix", nargs="+", metavar="TYPE=WEIGHT",
+                        help="Доли типов чеков во входных файлах (например, chancellery=3 representative_offices_event=1)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Количество повторов замера всей обработки")
+    parser.add_argument("-w", "--workers", type=int, default=1,
+                        help="Количество процессов для дополнительных отчетов")
+    parser.add_argument("--save-baseline", metavar="PATH",
+                        help="Сохранить замер всей обработки как базовый")
+    parser.add_argument("--baseline", metavar="PATH",
+                        help="Сравнить замер всей обработки с базовым")
+    args = parser.parse_args()
+
+    if "startup" in args.benches:
+        bench_startup(args.repeat)
+    if "layout" in args.benches:
+        bench_report_layout(args.sizes)
+    if "memory" in args.benches:
+        bench_report_memory(args.sizes)
+    if "formatting" in args.benches:
+        bench_formatting(args.format_count)
+    if "records" in args.benches:
+        bench_check_records(args.rows)
+    if "pipeline" in args.benches:
+        try:
+            pipeline_mix = parse_mix(args.mix) if args.mix else None
+        except argparse.ArgumentTypeError as e:
+            parser.error(str(e))
+        pipeline_results = bench_pipeline(args.pipeline_sizes, pipeline_mix, args.repeat, args.workers)
+        if args.save_baseline:
+            with open(args.save_baseline, "w", encoding="utf-8") as file:
+                json.dump(pipeline_results, file, ensure_ascii=False, indent=2)
+        if args.baseline:
+            with open(args.baseline, encoding="utf-8") as file:
+                compare_baseline(pipeline_results, json.load(file))
@@ -0,0 +1,43 @@
+import os
+from typing import List, Tuple
+
+
+def merge_pdfs(parts: List[Tuple[str, str]], output_path: str) -> int:
+    """Merge PDF files into one with a bookmark for every file.
+
+    The pages are copied as PDF objects, without rendering them again. A file
+    that is missing or cannot be read is left out with a message. The result
+    is written to a temporary file first, so a failed merge does not replace
+    the previous bundle.
+
+    Args:
+        parts (List[Tuple[str, str]]): The bookmark titles and the paths of the PDF files, in order.
+        output_path (str): The path of the resulting PDF file.
+
+    Returns:
+        int: The number of merged files.
+
+    Raises:
+        ImportError: If the pypdf package is not installed.
+    """
+    from pypdf import PdfWriter
+
+    writer = PdfWriter()
+    merged = 0
+    try:
+        for title, path in parts:
+            try:
+                # import_outline=False: закладки самих документов не нужны, только по одной на документ
+                writer.append(path, outline_item=title, import_outline=False)
+            except Exception as e:
+                print(f"PDF '{title}' не добавлен в комплект: {e}")
+                continue
+            merged += 1
+
+        temp_path = f"{output_path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as file:
+            writer.write(file)
+        os.replace(temp_path, output_path)
+    finally:
+        writer.close()
+    return merged
@@ -0,0 +1,98 @@
+import argparse
+import os
+import sys
+from multiprocessing.connection import Client
+from typing import Any, Dict, List, Optional
+from server import read_key, receive_message, send_message
+from config import SERVER_ADDRESS
+
+
+def request_server(message: Dict[str, Any], address: str = SERVER_ADDRESS) -> Optional[Dict[str, Any]]:
+    """Send a request to the report server and wait for its final reply.
+
+    Args:
+        message (Dict[str, Any]): The request (e.g., {"command": "ping"}).
+        address (str): The path of the socket or the name of the pipe.
+
+    Returns:
+        Optional[Dict[str, Any]]: The reply of the server, None if the server is not running
+            or stopped before replying.
+    """
+    key = read_key()
+    if key is None:
+        return None
+    try:
+        conn = Client(address, authkey=key)
+    except (OSError, EOFError):
+        return None
+
+    with conn:
+        try:
+            send_message(conn, message)
+            reply = receive_message(conn)
+            if reply["status"] == "queued":
+                if reply["position"] > 1:
+                    print(f"Задание в очереди, перед ним: {reply['position'] - 1}")
+                reply = receive_message(conn)
+        except (OSError, EOFError):
+            # Сервер остановился, не выполнив задание
+            print("Сервер отчетов прервал соединение")
+            return None
+    return reply
+
+
+def run_local(paths: List[str], path_save: str, force: bool) -> None:
+    """Create the reports in this process when the server is not running.
+
+    Args:
+        paths (List[str]): Files, directories or glob patterns of the input workbooks.
+        path_save (str): The path directory to save the reports.
+        force (bool): Create all reports, even the ones that did not change since the previous run.
+
+    Returns:
+        None
+    """
+    from main import run_batch, print_batch_results
+
+    print_batch_results(run_batch(paths, path_save, force=force))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Передача заданий серверу отчетов (main.py --serve)")
+    parser.add_argument("paths", nargs="*",
+                        help="Входные файлы, папки или шаблоны (*.xlsm), последним — папка для отчетов")
+    parser.add_argument("--force", action="store_true",
+                        help="Создать все отчеты заново, даже если данные не изменились")
+    parser.add_argument("--ping", action="store_true", help="Проверить, запущен ли сервер")
+    parser.add_argument("--stop", action="store_true", help="Остановить сервер")
+    args = parser.parse_args()
+
+    if args.ping or args.stop:
+        reply = request_server({"command": "stop" if args.stop else "ping"})
+        print("Сервер отчетов не запущен." if reply is None else f"Сервер отчетов: {reply['status']}")
+        sys.exit(0 if reply is not None else 1)
+
+    if len(args.paths) < 2:
+        print("Ошибка. Не переданы пути для работы скрипта.")
+        sys.exit(1)
+
+    # Сервер работает в своей папке, поэтому передаем полные пути
+    paths = [os.path.abspath(path) for path in args.paths[:-1]]
+    path_save = os.path.abspath(args.paths[-1])
+    reply = request_server({"command": "run", "paths": paths, "path_save": path_save, "force": args.force})
+
+    if reply is None:
+        print("Сервер отчетов не запущен, отчеты создаются без него...")
+        run_local(paths, path_save, args.force)
+    elif reply["status"] == "busy":
+        print("Ошибка. Очередь сервера отчетов заполнена, повторите позже.")
+        sys.exit(1)
+    elif reply["status"] == "error":
+        print(f"Ошибка сервера отчетов: {reply['error']}")
+        sys.exit(1)
+    else:
+        from schemas import WorkbookResult
+        from main import print_batch_results
+
+        print_batch_results([WorkbookResult.model_validate(result) for result in reply["results"]])
+    print("Создание отчетов завершено!")
@@ -1,3 +1,5 @@
+import os
+import sys
 from datetime import date
 
 
@@ -7,14 +9,65 @@ START_DATE = date(year=1899, month=12, day=30)
 # Для работы с числами в строковом формате
 LOCATE_DATE = 'ru_RU'
 
+# Размер кеша форматирования сумм и дат
+FORMAT_CACHE_SIZE = 4096
+
 # Всё для входного файла
 START_ROW_READ = 7
+HEADER_ROW = 6  # строка с заголовками столбцов чеков
 EMPLOYEE_CELL = "C1"
 POST_CELL = "E1"
 DEPARTMENT_CELL = "E3"
 REPORT_MONTH_CELL = "C3"
 DATE_REPORT = "C4"
+# Количество строк чеков, проверяемых за один раз
+VALIDATION_CHUNK_SIZE = 1000
 
 # Для отчета АО-1
 START_ROW_WRITE = 66
-COUNT_ROW_AFTER_CHECKS = 6
\ No newline at end of file
+COUNT_ROW_AFTER_CHECKS = 6
+# Запись строк чеков АО-1 через временный файл: память не растет с количеством чеков
+STREAM_REPORT = False
+# Группировка чеков АО-1 по видам с промежуточными итогами
+GROUP_REPORT = False
+# Строк таблицы АО-1 на странице при печати (None — разрывы страниц расставляет Excel)
+REPORT_ROWS_PER_PAGE = None
+
+# Для создания PDF: "com" (Microsoft Office), "libreoffice" или "null" (без PDF, для замеров)
+RENDERER = "com" if sys.platform == "win32" else "libreoffice"
+SOFFICE_PATH = "soffice"
+# Экземпляров LibreOffice, одновременно конвертирующих пакет файлов; у каждого, кроме первого,
+# свой профиль в SOFFICE_PROFILES_DIR (у процессов -w — свои профили для всех экземпляров)
+CONVERTER_PROCESSES = 1
+SOFFICE_PROFILES_DIR = os.path.join(os.path.expanduser("~"), ".cache", "advance_report_soffice")
+
+# Количество процессов для дополнительных отчетов (1 — без параллельности)
+REPORT_WORKERS = 1
+# Запись документов и создание PDF в фоновых потоках, пока заполняются следующие документы
+# (не для "com": Excel и Word работают только в потоке, который их запустил)
+OUTPUT_PIPELINE = True
+PIPELINE_QUEUE_SIZE = 4  # документов в очереди каждого этапа
+# Документов, конвертируемых в PDF за один запуск LibreOffice
+CONVERT_BATCH_SIZE = 50
+
+# Собрать PDF АО-1 и дополнительных документов в один файл с закладками (нужен пакет pypdf)
+BUNDLE_PDF = False
+
+# Для пакетной обработки
+INPUT_EXTENSIONS = (".xlsm", ".xlsx")
+BATCH_SUMMARY_FILE = "batch_summary.json"
+
+# Хеши входных данных отчетов, по ним повторный запуск пропускает неизмененные отчеты
+MANIFEST_FILE = ".reports_manifest.json"
+
+# Разобранные шаблоны между запусками (None — только в памяти процесса).
+# Файлы кеша читаются через pickle, поэтому папка должна быть доступна только пользователю
+TEMPLATE_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "advance_report_templates")
+
+# Сервер отчетов (main.py --serve) и клиент для макроса (client.py)
+SERVER_ADDRESS = (r"\\.\pipe\advance_report_server" if sys.platform == "win32"
+                  else os.path.join(os.path.expanduser("~"), ".cache", "advance_report_server.sock"))
+# Ключ подключения создается сервером при запуске, клиент читает его из этого файла
+SERVER_KEY_FILE = os.path.join(os.path.expanduser("~"), ".cache", "advance_report_server.key")
+SERVER_CONCURRENCY = 1  # заданий, обрабатываемых одновременно
+SERVER_QUEUE_SIZE = 8  # заданий в очереди, следующие получают отказ
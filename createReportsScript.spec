@@ -0,0 +1,36 @@
+# -*- mode: python ; coding: utf-8 -*-
+# Сборка: pyinstaller createReportsScript.spec
+# Собирает main.py (createReportsScript.exe) и client.py (createReportsClient.exe)
+# в одну папку dist/createReportsScript с общей папкой _internal.
+
+datas = [("templates", "templates")]
+
+script = Analysis(["main.py"], datas=datas)
+client = Analysis(["client.py"])
+
+script_exe = EXE(
+    PYZ(script.pure),
+    script.scripts,
+    [],
+    exclude_binaries=True,
+    name="createReportsScript",
+    console=True,
+)
+client_exe = EXE(
+    PYZ(client.pure),
+    client.scripts,
+    [],
+    exclude_binaries=True,
+    name="createReportsClient",
+    console=True,
+)
+
+coll = COLLECT(
+    script_exe,
+    script.binaries,
+    script.datas,
+    client_exe,
+    client.binaries,
+    client.datas,
+    name="createReportsScript",
+)
@@ -0,0 +1,167 @@
+import html
+import re
+import zipfile
+from typing import Any, BinaryIO, Dict, List, Tuple, Union
+from xml.sax.saxutils import escape
+
+
+# Части документа, в которых ищутся плейсхолдеры
+TEMPLATE_PARTS = re.compile(r'^word/(document|header\d*|footer\d*)\.xml$')
+
+TEXT_NODE = re.compile(r'(<w:t(?:\s[^>]*)?>)([^<]*)</w:t>|<w:t(?:\s[^>]*)?/>')
+PARAGRAPH_END = '</w:p>'
+PLACEHOLDER = re.compile(r'\{\{[^{}]*\}\}')
+
+
+class CompiledPart:
+    """A template part split into literal XML and placeholder slots.
+
+    Rendering joins literals[0], value of keys[0], literals[1], ..., so its cost
+    depends only on the number of placeholders.
+    """
+
+    def __init__(self, literals: List[str], keys: List[str]) -> None:
+        self.literals = literals
+        self.keys = keys
+
+    def render(self, values: Dict[str, str]) -> str:
+        """Join the part with escaped values of the placeholders.
+
+        Args:
+            values (Dict[str, str]): Escaped values by placeholder; a missing placeholder is left as text.
+
+        Returns:
+            str: The XML of the part.
+        """
+        result = [self.literals[0]]
+        for key, literal in zip(self.keys, self.literals[1:]):
+            result.append(values[key] if key in values else escape(key))
+            result.append(literal)
+        return ''.join(result)
+
+
+def compile_part(xml: str) -> CompiledPart:
+    """Compile WordprocessingML, finding placeholders even when they are split across several runs.
+
+    Word often splits a typed "{{name}}" into several <w:t> elements. The text of
+    every paragraph is joined, the placeholders are found in the joined text and
+    their slot is put into the <w:t> where the placeholder starts; the rest of the
+    placeholder is removed from the following elements. Markup outside the
+    touched <w:t> elements is kept as is.
+
+    Args:
+        xml (str): The XML of a document part.
+
+    Returns:
+        CompiledPart: The compiled part.
+    """
+    nodes = list(TEXT_NODE.finditer(xml))
+    texts = [html.unescape(node.group(2) or '') for node in nodes]
+
+    # Группы текстовых элементов одного абзаца
+    groups: List[List[int]] = []
+    prev_end = 0
+    for idx, node in enumerate(nodes):
+        if not groups or PARAGRAPH_END in xml[prev_end:node.start()]:
+            groups.append([])
+        groups[-1].append(idx)
+        prev_end = node.end()
+
+    # Новое содержимое затронутых элементов: куски текста и имена плейсхолдеров
+    new_contents: Dict[int, List[Tuple[bool, str]]] = {}
+    for group in groups:
+        full_text = ''.join(texts[idx] for idx in group)
+        matches = list(PLACEHOLDER.finditer(full_text))
+        if not matches:
+            continue
+
+        owners = [idx for idx in group for _ in texts[idx]]
+        contents = {idx: [] for idx in group}
+        pos = 0
+        for match in matches:
+            for char_pos in range(pos, match.start()):
+                contents[owners[char_pos]].append((False, full_text[char_pos]))
+            contents[owners[match.start()]].append((True, match.group(0)))
+            pos = match.end()
+        for char_pos in range(pos, len(full_text)):
+            contents[owners[char_pos]].append((False, full_text[char_pos]))
+
+        for idx in group:
+            if contents[idx] != [(False, char) for char in texts[idx]]:
+                new_contents[idx] = contents[idx]
+
+    literals: List[str] = []
+    keys: List[str] = []
+    buffer: List[str] = []
+    prev_end = 0
+    for idx, node in enumerate(nodes):
+        if idx not in new_contents:
+            continue
+        buffer.append(xml[prev_end:node.start()])
+        buffer.append('<w:t xml:space="preserve">')
+        for is_key, text in new_contents[idx]:
+            if is_key:
+                literals.append(''.join(buffer))
+                keys.append(text)
+                buffer = []
+            else:
+                buffer.append(escape(text))
+        buffer.append('</w:t>')
+        prev_end = node.end()
+    buffer.append(xml[prev_end:])
+    literals.append(''.join(buffer))
+
+    return CompiledPart(literals, keys)
+
+
+class DocxTemplate:
+    """A .docx template read and compiled once, rendered many times.
+
+    All parts of the package are kept in memory. The parts that can contain
+    placeholders are compiled, and the index maps every placeholder to the
+    parts it appears in.
+    """
+
+    def __init__(self, template_path: str) -> None:
+        """
+        Args:
+            template_path (str): The path to the .docx template.
+        """
+        self.template_path = template_path
+        self.items: List[Tuple[zipfile.ZipInfo, Union[bytes, CompiledPart]]] = []
+        self.index: Dict[str, List[str]] = {}
+
+        with zipfile.ZipFile(template_path) as template:
+            for item in template.infolist():
+                data = template.read(item.filename)
+                if TEMPLATE_PARTS.match(item.filename):
+                    part = compile_part(data.decode('utf-8'))
+                    for key in part.keys:
+                        parts = self.index.setdefault(key, [])
+                        if item.filename not in parts:
+                            parts.append(item.filename)
+                    self.items.append((item, part))
+                else:
+                    self.items.append((item, data))
+
+    def render(self, replacements: Dict[str, Any], output: Union[str, BinaryIO]) -> None:
+        """Write a filled document.
+
+        Args:
+            replacements (Dict[str, Any]): Placeholders (e.g., "{{date}}") and their values.
+            output (Union[str, BinaryIO]): The path or the binary file of the resulting .docx.
+
+        Returns:
+            None
+        """
+        values = {
+            key: escape('' if value is None else str(value))
+            for key, value in replacements.items()
+            if key in self.index
+        }
+
+        with zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as document:
+            for item, data in self.items:
+                if isinstance(data, CompiledPart):
+                    data = data.render(values).encode('utf-8')
+                document.writestr(item, data)
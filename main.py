@@ -1,37 +1,68 @@
+from __future__ import annotations
+
+import argparse
+import cProfile
+import glob
+import hashlib
+import json
 import math
+import multiprocessing
 import os
+import pickle
 import sys
-import win32com.client
+import tempfile
+import time
+from copy import copy
 from datetime import timedelta
-from typing import Optional, List
-from openpyxl import load_workbook
-from openpyxl.styles import Border, Side, numbers, Font, Alignment
+from contextlib import contextmanager, nullcontext, ExitStack
+from functools import partial
+from typing import TYPE_CHECKING, Any, Dict, Optional, List, Iterable, Iterator, Tuple, Callable
 from pydantic import ValidationError
-from babel.dates import format_date
-from schemas import ChecksDefault, AdditionalInfo, TypeCheck
+from schemas import CheckRecord, AdditionalInfo, TypeCheck, DocumentTask, DocumentResult, WorkbookResult, RowError
+from renderers import Renderer, RENDERERS, get_renderer
+from validation import map_columns, select_columns, validate_rows
+from profiling import Profiler, use_profiler, stage, timed, add_stage_time, count, save_profile
+from template_cache import template_cache
+from money import MoneyTotals, to_kopecks, split_kopecks, from_kopecks, format_amount
+from manifest import ReportManifest, file_hash, hash_values, task_digest, task_files
 from utils import (
-    create_check,
-    sum_money_all_checks,
-    create_text_price, validate_check,
-    get_absolute_path, create_representative_word,
-    convert_num_to_word, create_kopecks_str
+    create_text_price,
+    get_absolute_path,
+    convert_num_to_word, create_kopecks_str, format_locale_date, get_row_value,
+    cut_rows, paste_rows, merge_new_cells, make_style
 )
 from config import (
     POST_CELL,
     REPORT_MONTH_CELL,
     EMPLOYEE_CELL,
-    START_ROW_READ,
+    START_ROW_READ, HEADER_ROW,
     START_ROW_WRITE,
     COUNT_ROW_AFTER_CHECKS,
-    LOCATE_DATE, DATE_REPORT, DEPARTMENT_CELL
+    DATE_REPORT, DEPARTMENT_CELL,
+    RENDERER, REPORT_WORKERS, OUTPUT_PIPELINE, STREAM_REPORT, BUNDLE_PDF, GROUP_REPORT, REPORT_ROWS_PER_PAGE,
+    INPUT_EXTENSIONS, BATCH_SUMMARY_FILE
 )
 
+if TYPE_CHECKING:
+    from openpyxl.workbook.workbook import Workbook
+    from openpyxl.worksheet.worksheet import Worksheet
+    from xlsx_stream import RowSpool
+    from pipeline import OutputPipeline
+
+
+# Объединяемые ячейки в строке чека таблицы АО-1
+ROW_MERGES = (
+    ('B', 'C'), ('D', 'E'), ('F', 'G'),
+    ('H', 'K'), ('L', 'N'), ('O', 'Q'),
+    ('R', 'T'), ('U', 'W'), ('X', 'Y'),
+)
 
-def read_input_additional_info(file_path: str) -> Optional[AdditionalInfo]:
-    """Read additional information from an Excel file.
+
+def read_input_additional_info(header_rows: List[tuple]) -> Optional[AdditionalInfo]:
+    """Read additional information from the header rows of the input file.
 
     Args:
-        file_path (str): The path to the Excel file containing additional information.
+        header_rows (List[tuple]): The rows above START_ROW_READ as tuples of cell values.
 
     Returns:
         Optional[AdditionalInfo]: An AdditionalInfo object containing employee, report month, and post data.
@@ -40,15 +71,12 @@ def read_input_additional_info(file_path: str) -> Optional[AdditionalInfo]:
         ValidationError: If the data in the Excel file is invalid.
     """
     try:
-        workbook = load_workbook(file_path, data_only=True)
-        sheet = workbook.active
-
         data = AdditionalInfo(
-            employee=sheet[EMPLOYEE_CELL].value,
-            date_report=sheet[DATE_REPORT].value,
-            report_month=sheet[REPORT_MONTH_CELL].value,
-            post=sheet[POST_CELL].value,
-            department=sheet[DEPARTMENT_CELL].value
+            employee=get_row_value(header_rows, EMPLOYEE_CELL),
+            date_report=get_row_value(header_rows, DATE_REPORT),
+            report_month=get_row_value(header_rows, REPORT_MONTH_CELL),
+            post=get_row_value(header_rows, POST_CELL),
+            department=get_row_value(header_rows, DEPARTMENT_CELL)
         )
 
         return data
@@ -57,74 +85,259 @@ def read_input_additional_info(file_path: str) -> Optional[AdditionalInfo]:
         return None
 
 
-def read_input_checks(file_path: str) -> List[ChecksDefault]:
-    """Read check data from an Excel file and validate it.
+def parse_checks(rows: Iterable[tuple]) -> Iterator[CheckRecord]:
+    """Lazily build checks from validated rows of the input file.
+
+    The values were already converted by validate_rows, so the checks are
+    created without another validation.
 
     Args:
-        file_path (str): The path to the Excel file containing check data.
+        rows (Iterable[tuple]): The converted values of the rows that passed validate_rows.
 
-    Returns:
-        List[ChecksDefault]: A list of ChecksDefault objects created from the Excel data.
+    Yields:
+        CheckRecord: A check for every row.
+    """
+    for values in rows:
+        yield CheckRecord(*values)
 
-    Raises:
-        Exception: If any check data is invalid or missing required fields.
+
+def route_checks(checks: Iterable[CheckRecord], *sinks: Callable[[CheckRecord], None]) -> Iterator[CheckRecord]:
+    """Pass every check to the sinks as soon as it arrives and yield it further down the pipeline.
+
+    Args:
+        checks (Iterable[CheckRecord]): The checks to route.
+        *sinks (Callable[[CheckRecord], None]): Functions called with every check.
+
+    Yields:
+        CheckRecord: The same checks, after all sinks have processed them.
     """
-    workbook = load_workbook(file_path, data_only=True)
-    sheet = workbook.active
+    for check in checks:
+        for sink in sinks:
+            sink(check)
+        yield check
 
-    data = []
-    for row in sheet.iter_rows(min_row=START_ROW_READ, values_only=True):
-        if all(cell is None for cell in row):
-            break
 
-        check = create_check(row)
-        if check:
-            try:
-                validate_check(check)
-                data.append(check)
-            except Exception as e:
-                print(f"Ошибка валидации! {e}")
+def on_checks_end(checks: Iterable[CheckRecord], callback: Callable[[], None]) -> Iterator[CheckRecord]:
+    """Yield the checks and call a function once all of them were read.
 
-    # for row in data:
-    #     print(row)
+    Args:
+        checks (Iterable[CheckRecord]): The checks.
+        callback (Callable[[], None]): The function called after the last check.
 
-    return data
+    Yields:
+        CheckRecord: The same checks.
+    """
+    yield from checks
+    callback()
 
 
-def create_report(checks: List[ChecksDefault], info_data: AdditionalInfo, path_save: str) -> None:
-    """Create a report by filling a template with check data and additional information.
+@contextmanager
+def open_input(file_path: str) -> Iterator[Tuple[Optional[AdditionalInfo], Iterator[CheckRecord], List[RowError]]]:
+    """Open an Excel file and read it lazily in a single pass.
+
+    The workbook is opened once in read-only mode. The header cells are read
+    right away, the checks are validated and parsed only while the returned
+    iterator is consumed, so the workbook stays open until the context exits.
+    The check columns are found by the titles in HEADER_ROW and only the
+    columns up to the last of them are read. Rows with errors are skipped;
+    all their errors are collected in the returned list, which is complete
+    once the iterator is exhausted.
 
     Args:
-        checks (List[ChecksDefault]): A list of ChecksDefault objects to be included in the report.
-        info_data (AdditionalInfo): Additional information to be included in the report.
-        path_save (str): The path to save the report.
+        file_path (str): The path to the Excel file containing check data and additional information.
+
+    Yields:
+        Tuple[Optional[AdditionalInfo], Iterator[CheckRecord], List[RowError]]: The additional information,
+            the lazy stream of valid checks and the errors of the check rows.
+    """
+    from openpyxl import load_workbook
+
+    with stage("input_load"):
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.active
+        header_rows = list(sheet.iter_rows(max_row=START_ROW_READ - 1, values_only=True))
+        info = read_input_additional_info(header_rows)
+
+        columns = map_columns(header_rows[HEADER_ROW - 1] if len(header_rows) >= HEADER_ROW else ())
+        max_col = max(idx for idx in columns if idx is not None) + 1
+        rows = timed(sheet.iter_rows(min_row=START_ROW_READ, max_col=max_col, values_only=True), "row_read")
+
+        row_errors: List[RowError] = []
+        rows = timed(select_columns(rows, columns), "row_parse")
+        yield info, parse_checks(timed(validate_rows(rows, row_errors), "validation")), row_errors
+    finally:
+        workbook.close()
+
+
+def check_row_values(check: CheckRecord) -> Dict[int, Any]:
+    """Get the values of the AO-1 table row of a check.
+
+    Args:
+        check (CheckRecord): The check.
 
     Returns:
-        None
+        Dict[int, Any]: The values by column number.
+    """
+    amount = from_kopecks(to_kopecks(check.sum_check))  # та же сумма, что идет в итоги
+    return {
+        2: check.number_str,
+        4: check.date.strftime('%d.%m.%Y') if check.date is not None else None,
+        6: check.id_check,
+        8: check.type_document.value,
+        12: amount,
+        18: amount,
+    }
 
-    Raises:
-        Exception: If there is an error while creating the report.
+
+def check_digest_values(check: CheckRecord) -> Tuple[Dict[int, Any], Optional[str]]:
+    """Get the values of a check that AO-1 shows, for the hash of the report.
+
+    The fields used only by the additional documents are left out, so editing
+    them does not create AO-1 again.
+
+    Args:
+        check (CheckRecord): The check.
+
+    Returns:
+        Tuple[Dict[int, Any], Optional[str]]: The values of the table row and the type of the check,
+            which only matters with GROUP_REPORT.
     """
-    workbook = load_workbook(get_absolute_path("templates\\template_advance_report.xlsx"))
-    sheet = workbook.active
-    sys.stdout.reconfigure(encoding='utf-8')
+    return check_row_values(check), check.type.value if GROUP_REPORT else None
 
-    sum_checks = sum_money_all_checks(checks)
-    rubles = int(sum_checks)
-    kopecks = int((sum_checks - rubles) * 100)
 
-    sheet['R9'] = rubles
-    sheet['X9'] = kopecks
+def table_rows(checks: Iterable[CheckRecord], totals: MoneyTotals) -> Iterator[Dict[int, Any]]:
+    """Get the rows of the AO-1 table in the order of the checks.
+
+    Args:
+        checks (Iterable[CheckRecord]): The checks, read lazily.
+        totals (MoneyTotals): The totals the checks are added to.
+
+    Yields:
+        Dict[int, Any]: The values of a row by column number.
+    """
+    for check in checks:
+        totals.add(check)
+        yield check_row_values(check)
+
+
+def group_rows(group: Any) -> Iterator[Dict[int, Any]]:
+    """Read back the rows of a group collected by grouped_table_rows.
+
+    Args:
+        group (Any): The list of rows or the temporary file they were pickled to.
+
+    Yields:
+        Dict[int, Any]: The values of a row by column number.
+    """
+    if isinstance(group, list):
+        yield from group
+        return
+    group.seek(0)
+    while True:
+        try:
+            yield pickle.load(group)
+        except EOFError:
+            return
+
+
+def grouped_table_rows(checks: Iterable[CheckRecord], totals: MoneyTotals,
+                       on_disk: bool = False) -> Iterator[Dict[int, Any]]:
+    """Get the rows of the AO-1 table grouped by the type of check, each group followed by its subtotal.
+
+    The checks are grouped and added up in the same pass, so the subtotals are
+    known before the first row is written. The subtotal cells are SUBTOTAL
+    formulas, which the grand total skips. The rows of every group are kept
+    until all checks are read; with on_disk they go to a temporary file per
+    group, so memory does not grow with the number of checks.
+
+    Args:
+        checks (Iterable[CheckRecord]): The checks.
+        totals (MoneyTotals): The totals the checks are added to.
+        on_disk (bool): Keep the rows of the groups in temporary files instead of memory.
+
+    Yields:
+        Dict[int, Any]: The values of a row by column number.
+    """
+    from xlsx_stream import CachedFormula
+
+    groups: Dict[TypeCheck, Any] = {}
+    try:
+        for check in checks:
+            totals.add(check)
+            group = groups.get(check.type)
+            if group is None:
+                group = groups[check.type] = tempfile.TemporaryFile() if on_disk else []
+            if on_disk:
+                pickle.dump(check_row_values(check), group)
+            else:
+                group.append(check_row_values(check))
+
+        idx = START_ROW_WRITE
+        for check_type in TypeCheck:
+            if check_type not in groups:
+                continue
+            first_row = idx
+            for values in group_rows(groups[check_type]):
+                yield values
+                idx += 1
+            subtotal = from_kopecks(totals.by_type[check_type])
+            yield {
+                8: f"Итого: {check_type.value}",
+                12: CachedFormula(f"SUBTOTAL(9,L{first_row}:L{idx - 1})", subtotal),
+                18: CachedFormula(f"SUBTOTAL(9,R{first_row}:R{idx - 1})", subtotal),
+            }
+            idx += 1
+    finally:
+        for group in groups.values():
+            if not isinstance(group, list):
+                group.close()
+
+
+def fill_report(sheet: Worksheet, checks: Iterable[CheckRecord], info_data: AdditionalInfo,
+                spool: Optional[RowSpool] = None,
+                group: bool = GROUP_REPORT) -> Tuple[MoneyTotals, Dict[str, Any]]:
+    """Fill the AO-1 template sheet with check data and additional information.
+
+    The part of the template below START_ROW_WRITE is cut once before the checks
+    are written and pasted back under the last check row, so the table is laid
+    out with a single shift instead of inserting a row per check. Row merges
+    skip the overlap scan of Worksheet.merge_cells since every row is new.
+
+    With a spool, the check rows are not added to the sheet but written to the
+    spool, so memory does not grow with the number of checks; the sheet gets
+    the header, the totals and the footer, and save_report puts the rows in.
+
+    The amounts are added up in whole kopecks, so the header agrees with the
+    "Итого" formulas for any number of checks. The formulas get their values
+    as well, so Excel does not recalculate the workbook on open. With group,
+    the checks are grouped by type with a subtotal after each group; with a
+    spool as well, the groups wait for the last check in temporary files.
+
+    Args:
+        sheet (Worksheet): The active sheet of the AO-1 template.
+        checks (Iterable[CheckRecord]): The checks to be included in the report.
+        info_data (AdditionalInfo): Additional information to be included in the report.
+        spool (Optional[RowSpool]): The file for the check rows, None to add them to the sheet.
+        group (bool): Group the checks by type with subtotals.
+
+    Returns:
+        Tuple[MoneyTotals, Dict[str, Any]]: The number and the totals of the checks written to the table,
+            and the values of the formulas on the sheet by cell reference for save_report.
+    """
+    from openpyxl.styles import Border, Side, numbers, Font, Alignment
+    from openpyxl.worksheet.pagebreak import Break
+    from xlsx_stream import CachedFormula
+    from openpyxl.utils import column_index_from_string, get_column_letter
+    from openpyxl.worksheet.dimensions import RowDimension
+
     sheet['J13'] = info_data.date_report.strftime('%d.%m.%Y')
-    sheet['O15'] = format_date(info_data.date_report, format='d MMMM yyyy г.', locale=LOCATE_DATE)
+    sheet['O15'] = format_locale_date(info_data.date_report, 'd MMMM yyyy г.')
     sheet['H19'] = info_data.department
     sheet['F21'] = info_data.employee
-    sheet['Q23'] = f"Расходы {format_date(info_data.report_month, format='MMMM yyyy', locale=LOCATE_DATE)}"
-    sheet['J33'] = sum_checks
-    sheet['J39'] = create_text_price(rubles, kopecks)
+    sheet['Q23'] = f"Расходы {format_locale_date(info_data.report_month, 'MMMM yyyy')}"
     sheet['I55'] = info_data.employee
-    sheet['D56'] = format_date(info_data.date_report, format='d MMMM yyyy г.', locale=LOCATE_DATE)
-    sheet['K56'] = create_text_price(rubles, kopecks)
+    sheet['D56'] = format_locale_date(info_data.date_report, 'd MMMM yyyy г.')
 
     border = Border(
         left=Side(border_style='thin', color='000000'),
@@ -132,50 +345,72 @@ def create_report(checks: List[ChecksDefault], info_data: AdditionalInfo, path_s
         top=Side(border_style='thin', color='000000'),
         bottom=Side(border_style='thin', color='000000')
     )
+    # Стили ячеек строки чека регистрируются в книге один раз и копируются в каждую строку
+    workbook = sheet.parent
+    style_border = make_style(workbook, border)
+    column_styles = {
+        'B': make_style(workbook, border, number_format=numbers.FORMAT_NUMBER),
+        'D': make_style(workbook, border, Alignment(vertical='top', horizontal='center')),
+        'F': make_style(workbook, border, Alignment(vertical='top', horizontal='left')),
+        'H': make_style(workbook, border, Alignment(vertical='top', horizontal='left', wrap_text=True)),
+        'L': make_style(workbook, border, Alignment(vertical='top', horizontal='right'), numbers.FORMAT_NUMBER),
+        'R': make_style(workbook, border, Alignment(vertical='top', horizontal='right'), numbers.FORMAT_NUMBER),
+    }
+    row_styles = [
+        (column_index_from_string(column), column_styles.get(column, style_border))
+        for column in (get_column_letter(idx) for idx in range(2, 26))  # B:Y
+    ]
+    if spool is not None:
+        row_style_ids = [(column, workbook._cell_styles.add(style)) for column, style in row_styles]
+        template_rows = {idx: dimension for idx, dimension in sheet.row_dimensions.items() if idx >= START_ROW_WRITE}
+
+    # Всё, что ниже таблицы, переносится один раз после записи всех чеков
+    tail = cut_rows(sheet, START_ROW_WRITE)
+
+    totals = MoneyTotals()
+    cached: Dict[str, Any] = {}
+    rows = grouped_table_rows(checks, totals, spool is not None) if group else table_rows(checks, totals)
+    count_rows = 0
+    for idx, values in enumerate(rows, start=START_ROW_WRITE):
+        count_rows += 1
+
+        if spool is not None:
+            dimension = copy(template_rows[idx]) if idx in template_rows else RowDimension(sheet, index=idx)
+            dimension.height = 23
+            spool.write_row(idx, ((column, style_id, values.get(column)) for column, style_id in row_style_ids),
+                            dict(dimension))
+            continue
 
-    for idx, check in enumerate(checks, start=START_ROW_WRITE):
-        sheet.insert_rows(idx)
         sheet.row_dimensions[idx].height = 23
+        merge_new_cells(sheet, (f'{first_col}{idx}:{last_col}{idx}' for first_col, last_col in ROW_MERGES))
 
-        sheet.merge_cells(f'B{idx}:C{idx}')
-        sheet[f'B{idx}'].number_format = numbers.FORMAT_NUMBER
-        sheet[f'B{idx}'] = check.number_str
-
-        sheet.merge_cells(f'D{idx}:E{idx}')
-        sheet[f'D{idx}'] = check.date.strftime('%d.%m.%Y') if check.date is not None else None
-        sheet[f'D{idx}'].alignment = Alignment(vertical='top', horizontal='center')
-
-        sheet.merge_cells(f'F{idx}:G{idx}')
-        sheet[f'F{idx}'] = check.id_check if check.id_check is not None else None
-        sheet[f'F{idx}'].alignment = Alignment(vertical='top', horizontal='left')
-
-        sheet.merge_cells(f'H{idx}:K{idx}')
-        sheet[f'H{idx}'] = check.type_document.value
-        sheet[f'H{idx}'].alignment = Alignment(vertical='top', horizontal='left', wrap_text=True)
+        for column, value in values.items():
+            if isinstance(value, CachedFormula):
+                cached[f"{get_column_letter(column)}{idx}"] = value.value
+                value = f"={value.formula}"
+            sheet.cell(row=idx, column=column, value=value)
 
-        sheet.merge_cells(f'L{idx}:N{idx}')
-        sheet[f'L{idx}'].number_format = numbers.FORMAT_NUMBER
-        sheet[f'L{idx}'] = check.sum_check
-        sheet[f'L{idx}'].alignment = Alignment(vertical='top', horizontal='right')
+        for column, style in row_styles:
+            sheet.cell(row=idx, column=column)._style = copy(style)
 
-        sheet.merge_cells(f'O{idx}:Q{idx}')
+    if spool is not None:
+        # Высоты строк таблицы уже в файле, на листе их строк быть не должно
+        for idx in template_rows:
+            if idx < START_ROW_WRITE + count_rows:
+                del sheet.row_dimensions[idx]
 
-        sheet.merge_cells(f'R{idx}:T{idx}')
-        sheet[f'R{idx}'].number_format = numbers.FORMAT_NUMBER
-        sheet[f'R{idx}'] = check.sum_check
-        sheet[f'R{idx}'].alignment = Alignment(vertical='top', horizontal='right')
-
-        sheet.merge_cells(f'U{idx}:W{idx}')
-
-        sheet.merge_cells(f'X{idx}:Y{idx}')
-
-        for row in sheet[f'B{idx}:Y{idx}']:
-            for cell in row:
-                cell.border = border
+    # Суммы в шапке известны только после прохода по всем чекам
+    rubles, kopecks = split_kopecks(totals.total)
 
+    sheet['R9'] = rubles
+    sheet['X9'] = kopecks
+    sheet['J33'] = from_kopecks(totals.total)
+    sheet['J39'] = create_text_price(rubles, kopecks)
+    sheet['K56'] = create_text_price(rubles, kopecks)
 
     # Заполнение "Итого" и данных на этой строке
-    new_block_data_row = START_ROW_WRITE + len(checks)
+    new_block_data_row = START_ROW_WRITE + count_rows
+    paste_rows(sheet, new_block_data_row, tail)
 
     for i in range(COUNT_ROW_AFTER_CHECKS):
         sheet.row_dimensions[new_block_data_row + i].height = 11
@@ -184,12 +419,21 @@ def create_report(checks: List[ChecksDefault], info_data: AdditionalInfo, path_s
     sheet[f'H{new_block_data_row}'] = "Итого"
 
     sheet.merge_cells(f'L{new_block_data_row}:N{new_block_data_row}')
-    sheet[f'L{new_block_data_row}'] = f"=SUM(L{START_ROW_WRITE}:L{new_block_data_row - 1})"
+    # SUBTOTAL пропускает промежуточные итоги групп
+    total_function = "SUBTOTAL(9," if group else "SUM("
+    sheet[f'L{new_block_data_row}'] = f"={total_function}L{START_ROW_WRITE}:L{new_block_data_row - 1})"
 
     sheet.merge_cells(f'O{new_block_data_row}:Q{new_block_data_row}')
 
     sheet.merge_cells(f'R{new_block_data_row}:T{new_block_data_row}')
-    sheet[f'R{new_block_data_row}'] = f"=SUM(R{START_ROW_WRITE}:R{new_block_data_row - 1})"
+    sheet[f'R{new_block_data_row}'] = f"={total_function}R{START_ROW_WRITE}:R{new_block_data_row - 1})"
+    cached[f'L{new_block_data_row}'] = cached[f'R{new_block_data_row}'] = from_kopecks(totals.total)
+    # У всех формул есть значения, пересчитывать книгу при открытии не нужно
+    workbook.calculation.fullCalcOnLoad = False
+
+    if REPORT_ROWS_PER_PAGE:
+        for row in range(START_ROW_WRITE + REPORT_ROWS_PER_PAGE - 1, new_block_data_row - 1, REPORT_ROWS_PER_PAGE):
+            sheet.row_breaks.append(Break(id=row))
 
     sheet.merge_cells(f'U{new_block_data_row}:W{new_block_data_row}')
 
@@ -241,126 +485,634 @@ def create_report(checks: List[ChecksDefault], info_data: AdditionalInfo, path_s
 
     sheet[f'N{new_block_data_row + 2}'] = info_data.employee
 
-    workbook.save(f"{path_save}\\Авансовый отчет {info_data.date_report.strftime('%d-%m-%Y')}.xlsx")
+    return totals, cached
 
-    # EXCEL -> PDF
-    excel = win32com.client.Dispatch("Excel.Application")
 
-    workbook = excel.Workbooks.Open(get_absolute_path(f"{path_save}\\Авансовый отчет {info_data.date_report.strftime('%d-%m-%Y')}.xlsx"))
+def save_report(workbook: Workbook, file_path: str, spool: Optional[RowSpool] = None,
+                cached: Optional[Dict[str, Any]] = None) -> None:
+    """Save the filled AO-1 workbook.
 
-    worksheet = workbook.ActiveSheet
-    worksheet.ExportAsFixedFormat(0, get_absolute_path(f"{path_save}\\Авансовый отчет {info_data.date_report.strftime('%d-%m-%Y')}.pdf"))
+    openpyxl saves formulas without values, so the workbook is saved to a
+    temporary file first and the values of the formulas are added to the copy,
+    together with the spooled check rows.
+
+    Args:
+        workbook (Workbook): The workbook filled by fill_report.
+        file_path (str): The path of the resulting .xlsx file.
+        spool (Optional[RowSpool]): The table rows written by fill_report, None if they are on the sheet.
+        cached (Optional[Dict[str, Any]]): The values of the formulas on the sheet, returned by fill_report.
 
-    workbook.Close(False)
-    excel.Quit()
+    Returns:
+        None
+    """
+    if spool is None and not cached:
+        workbook.save(file_path)
+        return
 
+    from xlsx_stream import splice_rows
+
+    sheet = workbook.active
+    with tempfile.TemporaryDirectory() as temp_dir:
+        skeleton_path = os.path.join(temp_dir, "report.xlsx")
+        workbook.save(skeleton_path)
+
+        count_rows = spool.last_row - spool.first_row + 1 if spool is not None and spool.first_row is not None else 0
+        merges = (
+            f'{first_col}{idx}:{last_col}{idx}'
+            for idx in range(START_ROW_WRITE, START_ROW_WRITE + count_rows)
+            for first_col, last_col in ROW_MERGES
+        )
+        splice_rows(skeleton_path, sheet.path.lstrip('/'), spool, merges, count_rows * len(ROW_MERGES), file_path,
+                    cached)
+
+
+def report_title(info_data: AdditionalInfo) -> str:
+    """Get the file name (without extension) of the AO-1 report.
+
+    Args:
+        info_data (AdditionalInfo): Additional information of the report.
+
+    Returns:
+        str: The title of the report.
+    """
+    return f"Авансовый отчет {info_data.date_report.strftime('%d-%m-%Y')}"
+
+
+def create_report(checks: Iterable[CheckRecord], info_data: AdditionalInfo, path_save: str, renderer: Renderer,
+                  manifest: Optional[ReportManifest] = None,
+                  pipeline: Optional[OutputPipeline] = None) -> MoneyTotals:
+    """Create a report by filling a template with check data and additional information.
 
-def create_additional_reports(checks: List[ChecksDefault], info_data: AdditionalInfo, path_save: str) -> None:
-    """Function to generate additional reports based on check data and additional information.
+    Checks are written to the table as they arrive, so a lazy stream can be passed.
+    With STREAM_REPORT, the check rows go to a temporary file instead of the
+    sheet, so memory stays the same for any number of checks.
+    With a manifest, the checks are hashed while they are written; if the values
+    AO-1 shows, the additional information, the template and the renderer are
+    the same as in the previous run, saving and the PDF export are skipped.
 
     Args:
-        checks (List[ChecksDefault]): A list of check objects containing data for report generation.
+        checks (Iterable[CheckRecord]): The checks to be included in the report.
+        info_data (AdditionalInfo): Additional information to be included in the report.
+        path_save (str): The path to save the report.
+        renderer (Renderer): The backend used to export the report to PDF.
+        manifest (Optional[ReportManifest]): The hashes of the previous run, None to always create the report.
+        pipeline (Optional[OutputPipeline]): The pipeline of the additional documents; the PDF is exported
+            by its converter after the documents queued before, None to export it with the renderer.
+
+    Returns:
+        MoneyTotals: The number and the totals of the checks in the report.
+
+    Raises:
+        Exception: If there is an error while creating the report.
+    """
+    template_path = get_absolute_path(os.path.join("templates", "template_advance_report.xlsx"))
+    with stage("template_load"):
+        workbook = template_cache.load_workbook(template_path)
+    sheet = workbook.active
+    sys.stdout.reconfigure(encoding='utf-8')
+
+    checks_hash = hashlib.sha256()
+    if manifest is not None:
+        checks = route_checks(checks, lambda check: checks_hash.update(
+            json.dumps(check_digest_values(check), default=str).encode('utf-8')))
+
+    with ExitStack() as stack:
+        spool = None
+        if STREAM_REPORT:
+            from xlsx_stream import RowSpool
+            spool = stack.enter_context(RowSpool(sheet))
+        with stage("ao1_layout"):
+            totals, cached = fill_report(sheet, checks, info_data, spool)
+
+        title = report_title(info_data)
+        report_path = os.path.join(path_save, title)
+        if manifest is not None:
+            digest = hash_values(checks_hash.hexdigest(), info_data.model_dump(mode='json'), file_hash(template_path),
+                                 GROUP_REPORT, REPORT_ROWS_PER_PAGE, renderer.name)
+            if manifest.is_current(title, digest, (f"{report_path}.xlsx", f"{report_path}.pdf")):
+                print(f"Отчет '{title}' не изменился, пропуск")
+                return totals
+            manifest.start(title)
+
+        with stage("xlsx_save"):
+            save_report(workbook, f"{report_path}.xlsx", spool, cached)
+
+    # EXCEL -> PDF
+    with stage("ao1_pdf_export"):
+        if pipeline is not None:
+            pipeline.export_workbook(f"{report_path}.xlsx", f"{report_path}.pdf")
+        else:
+            renderer.export_workbook(f"{report_path}.xlsx", f"{report_path}.pdf")
+
+    if manifest is not None:
+        manifest.done(title, digest)
+    return totals
+
+
+def build_additional_report(check: CheckRecord, info_data: AdditionalInfo, path_save: str) -> Optional[DocumentTask]:
+    """Prepare the additional document for a single check, if its type needs one.
+
+    Args:
+        check (CheckRecord): The check containing data for report generation.
         info_data (AdditionalInfo): An object containing additional information required for the reports.
         path_save (str): The directory path where the generated reports will be saved.
 
+    Returns:
+        Optional[DocumentTask]: The document to render, or None if the check type has no additional document.
+    """
+    if check.type == TypeCheck.representative_offices_event:
+        money = math.ceil(check.sum_check / 1000) * 1000
+        date_compilation = check.date - timedelta(days=7)
+        replacements = {
+            "{{counterparty}}": check.counterparty,
+            "{{date_compilation}}": str(format_locale_date(date_compilation, 'dd MMMM yyyy г.')),
+            "{{date}}": str(format_locale_date(check.date, 'dd MMMM yyyy г.')),
+            "{{meeting_place}}": check.meeting_place,
+            "{{post}}": info_data.post,
+            "{{employee}}": info_data.employee,
+            "{{counterparty_participant}}": check.counterparty_participant,
+            "{{counterparty_post}}": check.counterparty_post,
+            "{{budget}}": f"{money:.2f} рублей ({convert_num_to_word(int(money))} рублей {create_kopecks_str(check.sum_check)} копеек)",
+            "{{day}}": str(format_locale_date(date_compilation, 'dd')),
+            "{{month}}": str(format_locale_date(date_compilation, 'MMMM')),
+            "{{year}}": str(format_locale_date(date_compilation, 'yyyy')),
+            "{{price_num}}": format_amount(to_kopecks(check.sum_check)),
+            "{{price_str}}": f"{convert_num_to_word(split_kopecks(to_kopecks(check.sum_check))[0])} рублей {create_kopecks_str(check.sum_check)} копеек",
+            "{{date_compilation_2}}": str(format_locale_date(date_compilation, '«dd» MMMM yyyy г.')),
+            "{{date_default}}": str(check.date.strftime('%d.%m.%Y')),
+            "{{id}}": str(check.id_check),
+        }
+        title = f"Представительские_{check.id_check}"
+        template = "template_representative.docx"
+    elif check.type == TypeCheck.representative_offices_present:
+        money = math.ceil(check.sum_check / 1000) * 1000
+        date_compilation = check.date - timedelta(days=7)
+        replacements = {
+            "{{topic}}": check.topic,
+            "{{date_compilation}}": str(format_locale_date(date_compilation, 'dd MMMM yyyy г.')),
+            "{{date}}": str(format_locale_date(check.date, '«dd» MMMM yyyy г.')),
+            "{{post}}": info_data.post,
+            "{{employee}}": info_data.employee,
+            "{{counterparty}}": check.counterparty,
+            "{{counterparty_participant}}": str(check.counterparty_participant),
+            "{{budget}}": f"{money:.2f} рублей ({convert_num_to_word(int(money))} рублей {create_kopecks_str(check.sum_check)} копеек)",
+            "{{day}}": str(format_locale_date(check.date, 'dd')),
+            "{{month}}": str(format_locale_date(check.date, 'MMMM')),
+            "{{year}}": str(format_locale_date(check.date, 'yyyy')),
+            "{{name_present}}": check.name_present,
+            "{{count_present}}": str(len([word.strip() for word in check.name_present.split(", ")])),
+            "{{price}}": format_amount(to_kopecks(check.sum_check))
+        }
+        title = f"Представительские Подарки_{check.id_check}"
+        template = "template_presents.docx"
+    elif check.type == TypeCheck.round_table_discussion_Club:
+        money = math.ceil(check.sum_check / 1000) * 1000
+        date_compilation = check.date - timedelta(days=7)
+        replacements = {
+            "{{medication}}": check.medication,
+            "{{date_compilation}}": str(format_locale_date(date_compilation, 'dd MMMM yyyy г.')),
+            "{{date}}": str(format_locale_date(check.date, 'dd MMMM yyyy г.')),
+            "{{meeting_place}}": check.meeting_place,
+            "{{post}}": info_data.post,
+            "{{employee}}": info_data.employee,
+            "{{topic}}": check.topic,
+            "{{counterparty_participant}}": check.counterparty_participant,
+            "{{counterparty_post}}": check.counterparty_post,
+            "{{budget}}": f"{money:.2f} рублей ({convert_num_to_word(int(money))} рублей {create_kopecks_str(check.sum_check)} копеек)",
+        }
+        title = f"БЗ Круглый стол_{check.id_check}"
+        template = "template_round_table.docx"
+    else:
+        return None
+
+    return DocumentTask(
+        title=title,
+        template_path=get_absolute_path(os.path.join("templates", template)),
+        replacements=replacements,
+        output_path=os.path.join(path_save, title),
+    )
+
+
+def document_stage(task: DocumentTask) -> str:
+    """Get the name of the profiling stage of a document, one per template.
+
+    Args:
+        task (DocumentTask): The document to render.
+
+    Returns:
+        str: The name of the stage (e.g., "document:template_presents.docx").
+    """
+    return f"document:{os.path.basename(task.template_path)}"
+
+
+def skip_unchanged(task: DocumentTask, manifest: ReportManifest,
+                   renderer_name: str) -> Tuple[Optional[DocumentResult], str]:
+    """Check the manifest before rendering an additional document.
+
+    Args:
+        task (DocumentTask): The document to render.
+        manifest (ReportManifest): The hashes of the previous run.
+        renderer_name (str): The name of the renderer backend creating the PDF.
+
+    Returns:
+        Tuple[Optional[DocumentResult], str]: The result of a skipped document (None if it has to be
+            rendered) and the hash of the inputs of the document.
+    """
+    digest = task_digest(task, renderer_name)
+    if manifest.is_current(task.title, digest, task_files(task)):
+        print(f"Отчет '{task.title}' не изменился, пропуск")
+        return DocumentResult(title=task.title, skipped=True), digest
+    manifest.start(task.title)
+    return None, digest
+
+
+def create_additional_report(task: DocumentTask, renderer: Renderer,
+                             manifest: Optional[ReportManifest] = None) -> DocumentResult:
+    """Render an additional document in this process.
+
+    Args:
+        task (DocumentTask): The document to render.
+        renderer (Renderer): The backend used to render the documents to PDF.
+        manifest (Optional[ReportManifest]): The hashes of the previous run, None to always render the document.
+
+    Returns:
+        DocumentResult: The outcome of rendering.
+    """
+    if manifest is not None:
+        skipped, digest = skip_unchanged(task, manifest, renderer.name)
+        if skipped is not None:
+            return skipped
+
+    print(f"Создание отчета '{task.title}'...")
+    start = time.perf_counter()
+    try:
+        with stage(document_stage(task)):
+            renderer.render_document(task.template_path, task.replacements, task.output_path)
+    except Exception as e:
+        print(f"Ошибка: {e}")
+        return DocumentResult(title=task.title, error=str(e), seconds=time.perf_counter() - start)
+    print(f"Отчет '{task.title}' создан!")
+    if manifest is not None:
+        manifest.done(task.title, digest)
+    return DocumentResult(title=task.title, seconds=time.perf_counter() - start)
+
+
+def bundle_reports(info_data: AdditionalInfo, documents: List[DocumentResult], path_save: str) -> Optional[str]:
+    """Merge the PDF files of AO-1 and of the additional documents into one file with bookmarks.
+
+    The documents that failed are left out; a document whose file name
+    repeats is added once.
+
+    Args:
+        info_data (AdditionalInfo): Additional information of the report.
+        documents (List[DocumentResult]): The outcome of the additional documents, in the order of the checks.
+        path_save (str): The directory of the reports.
+
+    Returns:
+        Optional[str]: The path of the merged file, None if it was not created.
+    """
+    title = report_title(info_data)
+    parts = [(title, os.path.join(path_save, f"{title}.pdf"))]
+    for document_title in dict.fromkeys(document.title for document in documents if document.error is None):
+        parts.append((document_title, os.path.join(path_save, f"{document_title}.pdf")))
+
+    from bundle import merge_pdfs
+
+    bundle_path = os.path.join(path_save, f"{title} (комплект).pdf")
+    try:
+        merged = merge_pdfs(parts, bundle_path)
+    except ImportError:
+        print("Для сборки комплекта PDF установите пакет pypdf")
+        return None
+    print(f"Комплект '{os.path.basename(bundle_path)}' собран, документов: {merged}")
+    return bundle_path
+
+
+def print_row_errors(errors: List[RowError]) -> None:
+    """Print the table of errors found in the check rows.
+
+    Args:
+        errors (List[RowError]): The errors of the check rows.
+
     Returns:
         None
     """
-    for check in checks:
-        if check.type == TypeCheck.representative_offices_event:
-            money = math.ceil(check.sum_check / 1000) * 1000
-            replacements = {
-                "{{counterparty}}": check.counterparty,
-                "{{date_compilation}}": str(format_date((check.date - timedelta(days=7)), format='dd MMMM yyyy г.', locale=LOCATE_DATE)),
-                "{{date}}": str(format_date(check.date, format='dd MMMM yyyy г.', locale=LOCATE_DATE)),
-                "{{meeting_place}}": check.meeting_place,
-                "{{post}}": info_data.post,
-                "{{employee}}": info_data.employee,
-                "{{counterparty_participant}}": check.counterparty_participant,
-                "{{counterparty_post}}": check.counterparty_post,
-                "{{budget}}": f"{money:.2f} рублей ({convert_num_to_word(int(money))} рублей {create_kopecks_str(check.sum_check)} копеек)",
-                "{{day}}": str(format_date((check.date - timedelta(days=7)), format='dd', locale=LOCATE_DATE)),
-                "{{month}}": str(format_date((check.date - timedelta(days=7)), format='MMMM', locale=LOCATE_DATE)),
-                "{{year}}": str(format_date((check.date - timedelta(days=7)), format='yyyy', locale=LOCATE_DATE)),
-                "{{price_num}}": f"{check.sum_check:.2f}",
-                "{{price_str}}": f"{convert_num_to_word(int(check.sum_check))} рублей {create_kopecks_str(check.sum_check)} копеек",
-                "{{date_compilation_2}}": str(format_date((check.date - timedelta(days=7)), format='«dd» MMMM yyyy г.', locale=LOCATE_DATE)),
-                "{{date_default}}": str(check.date.strftime('%d.%m.%Y')),
-                "{{id}}": str(check.id_check),
-            }
-            print(f"Создание отчета 'Представительские_{check.id_check}'...")
-            create_representative_word(replacements=replacements, file_template="template_representative.docx", output_path=f"{path_save}\\Представительские_{check.id_check}")
-            print(f"Отчет 'Представительские_{check.id_check}' создан!")
-        elif check.type == TypeCheck.representative_offices_present:
-            money = math.ceil(check.sum_check / 1000) * 1000
-            replacements = {
-                "{{topic}}": check.topic,
-                "{{date_compilation}}": str(format_date((check.date - timedelta(days=7)), format='dd MMMM yyyy г.', locale=LOCATE_DATE)),
-                "{{date}}": str(format_date(check.date, format='«dd» MMMM yyyy г.', locale=LOCATE_DATE)),
-                "{{post}}": info_data.post,
-                "{{employee}}": info_data.employee,
-                "{{counterparty}}": check.counterparty,
-                "{{counterparty_participant}}": str(check.counterparty_participant),
-                "{{budget}}": f"{money:.2f} рублей ({convert_num_to_word(int(money))} рублей {create_kopecks_str(check.sum_check)} копеек)",
-                "{{day}}": str(format_date(check.date, format='dd', locale=LOCATE_DATE)),
-                "{{month}}": str(format_date(check.date, format='MMMM', locale=LOCATE_DATE)),
-                "{{year}}": str(format_date(check.date, format='yyyy', locale=LOCATE_DATE)),
-                "{{name_present}}": check.name_present,
-                "{{count_present}}": str(len([word.strip() for word in check.name_present.split(", ")])),
-                "{{price}}": str(check.sum_check)
-            }
-            print(f"Создание отчета 'Представительские Подарки_{check.id_check}'...")
-            create_representative_word(replacements=replacements, file_template="template_presents.docx", output_path=f"{path_save}\\Представительские Подарки_{check.id_check}")
-            print(f"Отчет 'Представительские Подарки_{check.id_check}' создан!")
-        elif check.type == TypeCheck.round_table_discussion_Club:
-            money = math.ceil(check.sum_check / 1000) * 1000
-            replacements = {
-                "{{medication}}": check.medication,
-                "{{date_compilation}}": str(format_date((check.date - timedelta(days=7)), format='dd MMMM yyyy г.', locale=LOCATE_DATE)),
-                "{{date}}": str(format_date(check.date, format='dd MMMM yyyy г.', locale=LOCATE_DATE)),
-                "{{meeting_place}}": check.meeting_place,
-                "{{post}}": info_data.post,
-                "{{employee}}": info_data.employee,
-                "{{topic}}": check.topic,
-                "{{counterparty_participant}}": check.counterparty_participant,
-                "{{counterparty_post}}": check.counterparty_post,
-                "{{budget}}": f"{money:.2f} рублей ({convert_num_to_word(int(money))} рублей {create_kopecks_str(check.sum_check)} копеек)",
-            }
-            print(f"Создание отчета 'БЗ Круглый стол_{check.id_check}'...")
-            create_representative_word(replacements=replacements, file_template="template_round_table.docx", output_path=f"{path_save}\\БЗ Круглый стол_{check.id_check}")
-            print(f"Отчет 'БЗ Круглый стол_{check.id_check}' создан!")
+    if not errors:
+        return
+    print(f"Ошибки во входном файле ({len(errors)}), эти чеки пропущены:")
+    for error in errors:
+        check_id = f", чек {error.id_check}" if error.id_check is not None else ""
+        print(f"  Строка {error.row}{check_id}: {error.message}")
 
 
-def main(path_input_file: str, path_save: str) -> None:
-    """Main function to process an Excel file and generate a report.
+def print_document_results(results: List[DocumentResult]) -> None:
+    """Print the summary of the rendered additional documents.
+
+    Args:
+        results (List[DocumentResult]): The outcome of every rendered document.
+
+    Returns:
+        None
+    """
+    failed = [result for result in results if result.error is not None]
+    skipped = [result for result in results if result.skipped]
+    for result in failed:
+        print(f"Ошибка в отчете '{result.title}': {result.error}")
+    print(f"Дополнительных отчетов создано: {len(results) - len(failed) - len(skipped)}, "
+          f"без изменений: {len(skipped)}, с ошибками: {len(failed)}")
+
+
+def process_workbook(path_input_file: str, path_save: str, renderer: Renderer, workers: int = 1,
+                     force: bool = False, profile: bool = False) -> WorkbookResult:
+    """Create all reports for one input workbook.
+
+    Errors are recorded in the result instead of being raised, so a batch goes on with the next workbook.
+    Reports whose inputs did not change since the previous run into the same directory are skipped,
+    see ReportManifest.
 
     Args:
         path_input_file (str): The file path to the Excel file containing check data and additional information.
-        path_save (str): The path directory to save the report.
+        path_save (str): The path directory to save the reports.
+        renderer (Renderer): The backend used to render the reports to PDF.
+        workers (int): The number of processes rendering additional reports, 1 to render them with the given renderer
+            (through OutputPipeline with OUTPUT_PIPELINE, unless the renderer is bound to its thread).
+        force (bool): Create all reports, even the unchanged ones.
+        profile (bool): Measure the time of every stage and keep it in the profile of the result.
+
+    Returns:
+        WorkbookResult: The outcome of processing the workbook.
+    """
+    start = time.perf_counter()
+    result = WorkbookResult(input_path=path_input_file, output_path=path_save)
+    manifest = None
+    profiler = Profiler() if profile else None
+    with use_profiler(profiler):
+        try:
+            os.makedirs(path_save, exist_ok=True)
+            manifest = ReportManifest(path_save, force)
+            with open_input(path_input_file) as (info, checks, row_errors):
+                result.row_errors = row_errors
+                # Дополнительные отчеты создаются по мере чтения чеков, АО-1 заполняется тем же проходом
+                pipeline = None
+                if workers > 1:
+                    from parallel import DocumentPool
+
+                    pool = DocumentPool(workers, renderer.name)
+                elif OUTPUT_PIPELINE and not renderer.thread_bound:
+                    from pipeline import OutputPipeline
+
+                    pool = pipeline = OutputPipeline(renderer)
+                else:
+                    pool = None
+
+                digests: Dict[str, str] = {}
+                stages: Dict[str, str] = {}
+                # Место результата каждого документа в порядке чеков, документы пула заполняют его по завершении
+                documents: Dict[str, Optional[DocumentResult]] = {}
+                # Документы, которые в прошлом запуске заменил документ следующего чека с тем же именем
+                held: Dict[str, DocumentTask] = {}
+
+                def start_document(task: DocumentTask) -> None:
+                    if pool is None:
+                        documents[task.title] = create_additional_report(task, renderer, manifest)
+                        return
+                    skipped, digests[task.title] = skip_unchanged(task, manifest, renderer.name)
+                    if skipped is not None:
+                        documents[task.title] = skipped
+                    else:
+                        pool.submit(task)  # документ того же файла, переданный раньше, пул заменяет
+
+                def submit(check: CheckRecord) -> None:
+                    with stage("document_prepare"):
+                        task = build_additional_report(check, info, path_save)
+                    if task is None:
+                        return
+                    documents.setdefault(task.title, None)
+                    stages[task.title] = document_stage(task)
+                    if manifest.add_version(task.title):
+                        held[task.title] = task
+                        return
+                    held.pop(task.title, None)
+                    start_document(task)
+
+                def start_held() -> None:
+                    # Чеков с этим именем документа стало меньше, чем в прошлом запуске
+                    for task in held.values():
+                        start_document(task)
+                    held.clear()
+
+                try:
+                    with pool if pool is not None else nullcontext():
+                        checks = on_checks_end(route_checks(checks, submit), start_held)
+                        totals = create_report(checks, info, path_save, renderer, manifest, pipeline)
+
+                    if pool is not None:
+                        for document in pool.results:
+                            documents[document.title] = document
+                            add_stage_time(stages[document.title], document.seconds)
+                        # На диске остается последний документ каждого файла
+                        for title in {document.title for document in pool.results}:
+                            if documents[title].error is None:
+                                manifest.done(title, digests[title])
+                finally:
+                    result.documents = [document for document in documents.values() if document is not None]
+                result.checks = totals.count
+                result.totals = totals.to_dict()
+            if BUNDLE_PDF:
+                with stage("pdf_bundle"):
+                    result.bundle_path = bundle_reports(info, result.documents, path_save)
+        except Exception as e:
+            print(f"Ошибка при обработке файла '{path_input_file}': {e}")
+            result.error = str(e)
+        finally:
+            if manifest is not None:
+                try:
+                    manifest.save()
+                except OSError as e:
+                    print(f"Не удалось сохранить {manifest.path}: {e}")
+
+        count("workbooks")
+        count("checks", result.checks)
+        count("row_errors", len(result.row_errors))
+        count("documents", sum(1 for document in result.documents if not document.skipped and document.error is None))
+        count("documents_skipped", sum(1 for document in result.documents if document.skipped))
+        count("documents_failed", sum(1 for document in result.documents if document.error is not None))
+
+    if profiler is not None:
+        result.profile = profiler.to_dict()
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def find_workbooks(paths: List[str]) -> List[str]:
+    """Expand input paths into the list of workbooks to process.
+
+    Args:
+        paths (List[str]): Files, directories (all .xlsm/.xlsx inside) or glob patterns.
+
+    Returns:
+        List[str]: The paths of the workbooks in a stable order, without duplicates.
+    """
+    workbooks = []
+    for path in paths:
+        if os.path.isdir(path):
+            found = sorted(
+                os.path.join(path, name) for name in os.listdir(path)
+                if name.lower().endswith(INPUT_EXTENSIONS) and not name.startswith("~$")
+            )
+        elif os.path.isfile(path):
+            found = [path]
+        else:
+            found = sorted(glob.glob(path))
+        for workbook in found:
+            if workbook not in workbooks:
+                workbooks.append(workbook)
+    return workbooks
+
+
+def run_batch(input_paths: List[str], path_save: str, workers: int = REPORT_WORKERS, renderer_name: str = RENDERER,
+              force: bool = False, profile: bool = False, renderer: Optional[Renderer] = None) -> List[WorkbookResult]:
+    """Process several input workbooks in one run.
+
+    The renderer and its compiled templates are created once for the whole
+    batch, or an open renderer is reused (e.g., by the report server). With
+    several workbooks and workers > 1, the workbooks are processed in worker
+    processes, each with its own renderer; with a single workbook the workers
+    render its additional reports. When there is more than one
+    workbook, the reports of each go to a subdirectory named after it and a
+    summary is saved to BATCH_SUMMARY_FILE.
+
+    Args:
+        input_paths (List[str]): Files, directories or glob patterns of the input workbooks.
+        path_save (str): The path directory to save the reports.
+        workers (int): The number of worker processes.
+        renderer_name (str): The name of the renderer backend.
+        force (bool): Create all reports, even the ones that did not change since the previous run.
+        profile (bool): Measure the stages of every workbook, see process_workbook.
+        renderer (Optional[Renderer]): An open renderer to use instead of a new one; it is left open.
+            Not used when the workbooks are processed in worker processes.
+
+    Returns:
+        List[WorkbookResult]: The outcome of every workbook.
+    """
+    workbooks = find_workbooks(input_paths)
+    if len(workbooks) <= 1:
+        outputs = [path_save] * len(workbooks)
+    else:
+        outputs = []
+        for workbook in workbooks:
+            name = os.path.splitext(os.path.basename(workbook))[0]
+            output = os.path.join(path_save, name)
+            while output in outputs:
+                output = f"{output}_"
+            outputs.append(output)
+
+    if workers > 1 and len(workbooks) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        from parallel import init_worker, run_with_renderer
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(renderer_name,)) as executor:
+            futures = [
+                executor.submit(run_with_renderer, partial(process_workbook, force=force, profile=profile), workbook, output)
+                for workbook, output in zip(workbooks, outputs)
+            ]
+            results = [future.result() for future in futures]
+    else:
+        with nullcontext(renderer) if renderer is not None else get_renderer(renderer_name) as renderer:
+            results = [
+                process_workbook(workbook, output, renderer, workers, force, profile)
+                for workbook, output in zip(workbooks, outputs)
+            ]
+
+    if len(workbooks) > 1:
+        os.makedirs(path_save, exist_ok=True)
+        with open(os.path.join(path_save, BATCH_SUMMARY_FILE), "w", encoding="utf-8") as file:
+            json.dump([result.model_dump() for result in results], file, ensure_ascii=False, indent=2)
+
+    return results
+
+
+def print_batch_results(results: List[WorkbookResult]) -> None:
+    """Print the outcome of every processed workbook.
+
+    Args:
+        results (List[WorkbookResult]): The outcome of every workbook.
 
     Returns:
         None
     """
-    print("Старт сканирования данных...")
-    checks_all = read_input_checks(path_input_file)
-    info = read_input_additional_info(path_input_file)
-    print("Сканирование завершено!")
-    print("Старт создание отчетов...")
-    create_report(checks_all, info, path_save)
-    create_additional_reports(checks_all, info, path_save)
-    print("Создание отчетов завершено!")
-    print("Можете закрывать консоль.")
+    for result in results:
+        print_row_errors(result.row_errors)
+        print_document_results(result.documents)
+        status = "ошибка" if result.error else "готово"
+        amount = f", сумма: {format_amount(result.totals['total'])} руб." if result.totals else ""
+        print(f"{result.input_path}: {status}, чеков: {result.checks}{amount}, {result.seconds:.1f} с")
+    if not results:
+        print("Ошибка. Не найдены входные файлы.")
 
 
-if __name__ == "__main__":
-    print("Запуск скрипта...")
-    if len(sys.argv) > 2:
-        file_path_input = sys.argv[1]
-        file_path_save = sys.argv[2]
+def save_run_profile(results: List[WorkbookResult], path: str) -> None:
+    """Save the stage times of the processed workbooks and print the totals.
 
-        if not os.path.exists(file_path_save):
-            os.makedirs(file_path_save)
+    Args:
+        results (List[WorkbookResult]): The outcome of every workbook, processed with profile=True.
+        path (str): The path of the report (.json or .csv).
 
-        main(file_path_input, file_path_save)
+    Returns:
+        None
+    """
+    total = Profiler()
+    parts = []
+    for result in results:
+        if result.profile is not None:
+            total.merge(result.profile)
+            parts.append((result.input_path, result.profile))
+    data = total.to_dict()
+    save_profile(path, data, parts)
+
+    print(f"Замеры времени сохранены в '{path}':")
+    for name, stats in data["stages"].items():
+        print(f"  {name}: {stats['self']:.3f} с (всего {stats['total']:.3f} с, вызовов: {stats['calls']})")
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    print("Запуск скрипта...")
+    parser = argparse.ArgumentParser(description="Создание авансового отчета и дополнительных документов")
+    parser.add_argument("paths", nargs="*",
+                        help="Входные файлы, папки или шаблоны (*.xlsm), последним — папка для отчетов")
+    parser.add_argument("-w", "--workers", type=int, default=REPORT_WORKERS,
+                        help="Количество процессов")
+    parser.add_argument("--renderer", choices=sorted(RENDERERS), default=RENDERER,
+                        help="Способ создания PDF")
+    parser.add_argument("--force", action="store_true",
+                        help="Создать все отчеты заново, даже если данные не изменились")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="Сохранить время этапов обработки в файл .json или .csv")
+    parser.add_argument("--cprofile", metavar="PATH",
+                        help="Сохранить профиль cProfile основного процесса (.prof)")
+    parser.add_argument("--serve", action="store_true",
+                        help="Запустить сервер отчетов, задания ему передает client.py")
+    args = parser.parse_args()
+
+    if args.serve:
+        from server import ReportServer
+
+        ReportServer(run_batch, renderer_name=args.renderer, workers=args.workers).serve_forever()
+    elif len(args.paths) > 1:
+        print("Старт сканирования данных и создания отчетов...")
+        cprofiler = cProfile.Profile() if args.cprofile else None
+        if cprofiler is not None:
+            cprofiler.enable()
+        batch_results = run_batch(args.paths[:-1], args.paths[-1], args.workers, args.renderer, args.force,
+                                  args.profile is not None)
+        if cprofiler is not None:
+            cprofiler.disable()
+            cprofiler.dump_stats(args.cprofile)
+        print_batch_results(batch_results)
+        if batch_results and args.profile:
+            save_run_profile(batch_results, args.profile)
+        print("Создание отчетов завершено!")
+        print("Можете закрывать консоль.")
     else:
-        print("Ошибка. Не переданы пути для работы скрипта.")
\ No newline at end of file
+        print("Ошибка. Не переданы пути для работы скрипта.")
@@ -0,0 +1,177 @@
+import hashlib
+import json
+import os
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional
+from schemas import DocumentTask
+from config import MANIFEST_FILE
+
+
+@lru_cache(maxsize=64)
+def _file_hash(path: str, mtime: float, size: int) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_hash(path: str) -> str:
+    """Get the SHA-256 of a file, reading it again only when its mtime or size change.
+
+    Args:
+        path (str): The path to the file.
+
+    Returns:
+        str: The hex digest of the file content.
+    """
+    stat = os.stat(path)
+    return _file_hash(os.path.abspath(path), stat.st_mtime, stat.st_size)
+
+
+def hash_values(*values: Any) -> str:
+    """Get a stable SHA-256 of JSON-serializable values.
+
+    Args:
+        *values (Any): The values to hash; dates and other objects are converted to str.
+
+    Returns:
+        str: The hex digest of the values.
+    """
+    data = json.dumps(values, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def task_digest(task: DocumentTask, renderer_name: str) -> str:
+    """Get the hash of everything an additional document is created from.
+
+    The replacements hold the normalized check and additional information
+    values the document uses, the template is hashed by its content. The
+    renderer is part of the hash: the "null" renderer writes empty PDFs, which
+    a real renderer has to replace.
+
+    Args:
+        task (DocumentTask): The document to render.
+        renderer_name (str): The name of the renderer backend creating the PDF.
+
+    Returns:
+        str: The hex digest of the inputs of the document.
+    """
+    return hash_values(task.replacements, file_hash(task.template_path), renderer_name)
+
+
+def task_files(task: DocumentTask) -> List[str]:
+    """Get the files an additional document is saved to.
+
+    Args:
+        task (DocumentTask): The document to render.
+
+    Returns:
+        List[str]: The paths of the .docx and PDF files.
+    """
+    return [f"{task.output_path}.docx", f"{task.output_path}.pdf"]
+
+
+class ReportManifest:
+    """Hashes of the inputs every report in an output directory was created from.
+
+    The manifest lets a rerun skip the reports whose inputs have not changed.
+    An entry is dropped as soon as its file starts being rewritten and is set
+    again only when the file is written successfully, so the manifest always
+    describes what is on disk.
+
+    Several checks can produce a report with the same name; the report of the
+    last of them is the one left on disk. The entry of such a report keeps the
+    number of reports with its name, so a rerun can let the earlier ones wait
+    for the last one instead of rendering them again (see add_version).
+    """
+
+    def __init__(self, path_save: str, force: bool = False) -> None:
+        """
+        Args:
+            path_save (str): The directory with the reports and the manifest file.
+            force (bool): Ignore the saved hashes and regenerate everything.
+        """
+        self.path = os.path.join(path_save, MANIFEST_FILE)
+        self.force = force
+        # Хеш отчета или [хеш, количество отчетов с этим именем]
+        self.entries: Dict[str, Any] = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, encoding="utf-8") as file:
+                    self.entries = json.load(file)
+            except (OSError, ValueError) as e:
+                print(f"Не удалось прочитать {self.path}, отчеты будут созданы заново: {e}")
+        self.previous_versions = {key: entry[1] for key, entry in self.entries.items() if isinstance(entry, list)}
+        self.versions: Dict[str, int] = {}
+
+    def digest(self, key: str) -> Optional[str]:
+        """Get the saved hash of a report.
+
+        Args:
+            key (str): The name of the report.
+
+        Returns:
+            Optional[str]: The hash of the inputs of the report, None if it is not in the manifest.
+        """
+        entry = self.entries.get(key)
+        return entry[0] if isinstance(entry, list) else entry
+
+    def add_version(self, key: str) -> bool:
+        """Count one more report with this name in the current run.
+
+        Args:
+            key (str): The name of the report.
+
+        Returns:
+            bool: True if in the previous run a later report with this name replaced this one on disk,
+                so it does not have to be rendered unless it turns out to be the last one.
+        """
+        self.versions[key] = self.versions.get(key, 0) + 1
+        return self.versions[key] < self.previous_versions.get(key, 1)
+
+    def is_current(self, key: str, digest: str, paths: Iterable[str]) -> bool:
+        """Check whether a report was created from the same inputs and its files still exist.
+
+        Args:
+            key (str): The name of the report.
+            digest (str): The hash of the inputs of the report.
+            paths (Iterable[str]): The files of the report.
+
+        Returns:
+            bool: True if the report can be skipped.
+        """
+        if self.force or self.digest(key) != digest:
+            return False
+        return all(os.path.exists(path) for path in paths)
+
+    def start(self, key: str) -> None:
+        """Forget the hash of a report whose files are being rewritten.
+
+        Args:
+            key (str): The name of the report.
+
+        Returns:
+            None
+        """
+        self.entries.pop(key, None)
+
+    def done(self, key: str, digest: str) -> None:
+        """Remember the hash of a report that was written successfully.
+
+        Args:
+            key (str): The name of the report.
+            digest (str): The hash of the inputs of the report.
+
+        Returns:
+            None
+        """
+        versions = self.versions.get(key, 1)
+        self.entries[key] = digest if versions <= 1 else [digest, versions]
+
+    def save(self) -> None:
+        """Write the manifest next to the reports."""
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(self.entries, file, ensure_ascii=False, indent=2, sort_keys=True)
+        os.replace(temp_path, self.path)
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+from decimal import Decimal, ROUND_HALF_UP
+from typing import TYPE_CHECKING, Any, Dict, Tuple
+
+if TYPE_CHECKING:
+    from schemas import CheckRecord, TypeCheck, TypeDocument
+
+
+def to_kopecks(amount: float) -> int:
+    """Convert an amount in rubles to whole kopecks.
+
+    The amount is rounded to the nearest kopeck, halves away from zero. It is
+    rounded as written (e.g., 0.125), not as the float stores it: 0.29 is
+    stored as 0.28999..., and 0.125 * 100 would round to even.
+
+    Args:
+        amount (float): The amount in rubles.
+
+    Returns:
+        int: The amount in kopecks.
+    """
+    return int(Decimal(str(amount)).scaleb(2).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def split_kopecks(kopecks: int) -> Tuple[int, int]:
+    """Split an amount in kopecks into rubles and kopecks.
+
+    A negative amount is split by its absolute value and the rubles get the
+    sign (-150 is -1 ruble 50 kopecks). The sign of an amount under a ruble
+    is lost, use format_amount to print the amount.
+
+    Args:
+        kopecks (int): The amount in kopecks.
+
+    Returns:
+        Tuple[int, int]: The rubles and the remaining kopecks (0-99).
+    """
+    rubles, rest = divmod(abs(kopecks), 100)
+    return (-rubles if kopecks < 0 else rubles), rest
+
+
+def from_kopecks(kopecks: int) -> float:
+    """Convert an amount in kopecks to rubles for a cell of a report.
+
+    Args:
+        kopecks (int): The amount in kopecks.
+
+    Returns:
+        float: The amount in rubles, the float nearest to the exact amount.
+    """
+    return kopecks / 100
+
+
+def format_amount(kopecks: int) -> str:
+    """Format an amount in kopecks as rubles with two decimals (e.g., "1234.50" or "-0.50").
+
+    Args:
+        kopecks (int): The amount in kopecks.
+
+    Returns:
+        str: The formatted amount.
+    """
+    rubles, rest = divmod(abs(kopecks), 100)
+    return f"{'-' if kopecks < 0 else ''}{rubles}.{rest:02d}"
+
+
+class MoneyTotals:
+    """Exact totals of checks in kopecks: overall, by type of check and by type of document.
+
+    The totals are integers, so the header of AO-1, the "Итого" row and the
+    documents agree to the kopeck for any number of checks.
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0
+        self.by_type: Dict[TypeCheck, int] = {}
+        self.by_document: Dict[TypeDocument, int] = {}
+
+    def add(self, check: CheckRecord) -> int:
+        """Add the amount of a check to the totals.
+
+        Args:
+            check (CheckRecord): The check.
+
+        Returns:
+            int: The amount of the check in kopecks.
+        """
+        kopecks = to_kopecks(check.sum_check)
+        self.count += 1
+        self.total += kopecks
+        self.by_type[check.type] = self.by_type.get(check.type, 0) + kopecks
+        self.by_document[check.type_document] = self.by_document.get(check.type_document, 0) + kopecks
+        return kopecks
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the totals for the summary of a run.
+
+        Returns:
+            Dict[str, Any]: {"count", "total", "by_type", "by_document"}, the amounts in kopecks,
+                the types by their values.
+        """
+        return {
+            "count": self.count,
+            "total": self.total,
+            "by_type": {key.value: value for key, value in self.by_type.items()},
+            "by_document": {key.value: value for key, value in self.by_document.items()},
+        }
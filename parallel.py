@@ -0,0 +1,123 @@
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import util
+from typing import Any, Callable, Dict, List, Optional
+from renderers import Renderer, LibreOfficeRenderer, get_renderer
+from schemas import DocumentTask, DocumentResult
+
+
+# Рендерер процесса-исполнителя, создается один раз на процесс
+worker_renderer: Optional[Renderer] = None
+
+
+def init_worker(renderer_name: str) -> None:
+    """Create the renderer of a worker process and close it when the process exits.
+
+    LibreOffice instances with the same user profile cannot run at the same
+    time, so LibreOffice gets a profile of its own in every worker.
+
+    Args:
+        renderer_name (str): The name of the renderer backend.
+
+    Returns:
+        None
+    """
+    global worker_renderer
+    worker_renderer = get_renderer(renderer_name)
+    if isinstance(worker_renderer, LibreOfficeRenderer):
+        worker_renderer.profile = f"worker-{os.getpid()}"
+    util.Finalize(None, worker_renderer.close, exitpriority=10)
+
+
+def render_task(task: DocumentTask) -> DocumentResult:
+    """Render a document in a worker process.
+
+    Args:
+        task (DocumentTask): The document to render.
+
+    Returns:
+        DocumentResult: The outcome of rendering, with the error message if it failed.
+    """
+    start = time.perf_counter()
+    try:
+        worker_renderer.render_document(task.template_path, task.replacements, task.output_path)
+    except Exception as e:
+        return DocumentResult(title=task.title, error=str(e), seconds=time.perf_counter() - start)
+    return DocumentResult(title=task.title, seconds=time.perf_counter() - start)
+
+
+def run_with_renderer(func: Callable[..., Any], *args: Any) -> Any:
+    """Call a function in a worker process, passing the renderer of the worker as the last argument.
+
+    Args:
+        func (Callable[..., Any]): The function to call.
+        *args (Any): The arguments before the renderer.
+
+    Returns:
+        Any: The result of the function.
+    """
+    return func(*args, worker_renderer)
+
+
+class DocumentPool:
+    """Renders additional documents in a pool of worker processes.
+
+    Documents are independent, so they are rendered in any order. When several
+    checks produce the same file name, the document of the last check is the
+    one left on disk, the same as with sequential rendering.
+    """
+
+    def __init__(self, workers: int, renderer_name: str) -> None:
+        """
+        Args:
+            workers (int): The number of worker processes.
+            renderer_name (str): The name of the renderer backend used by the workers.
+        """
+        self.executor = ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(renderer_name,))
+        self.futures: Dict[str, Future] = {}
+        self.results: List[DocumentResult] = []
+
+    def submit(self, task: Optional[DocumentTask]) -> None:
+        """Queue a document for rendering.
+
+        Args:
+            task (Optional[DocumentTask]): The document to render, None is ignored.
+
+        Returns:
+            None
+        """
+        if task is None:
+            return
+
+        previous = self.futures.get(task.output_path)
+        if previous is not None and not previous.cancel():
+            # Файл с таким именем уже создается, новый документ должен записаться после него
+            self.results.append(previous.result())
+
+        print(f"Создание отчета '{task.title}'...")
+        self.futures[task.output_path] = self.executor.submit(render_task, task)
+
+    def wait(self) -> List[DocumentResult]:
+        """Wait for all queued documents.
+
+        Returns:
+            List[DocumentResult]: The outcome of every rendered document.
+        """
+        for future in self.futures.values():
+            self.results.append(future.result())
+        self.futures.clear()
+        return self.results
+
+    def close(self) -> None:
+        """Wait for the queued documents and stop the worker processes."""
+        try:
+            self.wait()
+        finally:
+            self.executor.shutdown()
+
+    def __enter__(self) -> "DocumentPool":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
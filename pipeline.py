@@ -0,0 +1,220 @@
+import io
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Set, Tuple
+from renderers import Renderer
+from profiling import stage
+from schemas import DocumentTask, DocumentResult
+from config import PIPELINE_QUEUE_SIZE, CONVERT_BATCH_SIZE
+
+
+class OutputPipeline:
+    """Writes the filled documents and converts them to PDF in background threads.
+
+    Filling a template is CPU work and stays on the calling thread. The filled
+    document goes to a writer thread, which saves it to the reports directory,
+    and then to a converter thread, which exports it to PDF, so a slow disk or
+    converter does not hold up filling the next document. The stages are
+    bounded: when a stage falls behind, submit waits instead of keeping every
+    document in memory.
+
+    All PDF exports of the run, including AO-1, go through the single converter
+    thread, so the office backend never converts two files at once. The
+    converter collects the saved files and exports them in bulk (see
+    Renderer.export_files): when batch_size files are collected, when AO-1 is
+    queued and when the pipeline is closed. The renderer must not be bound to
+    the thread that created it (see Renderer.thread_bound).
+
+    Has the same interface as parallel.DocumentPool. When several documents
+    are submitted for the same file, the last one is left on disk: an earlier
+    one still waiting to be written or converted is dropped without a result.
+    The time of a result is the time of writing and converting the document;
+    filling is measured on the calling thread as the document_fill stage.
+    """
+
+    def __init__(self, renderer: Renderer, queue_size: int = PIPELINE_QUEUE_SIZE,
+                 batch_size: int = CONVERT_BATCH_SIZE) -> None:
+        """
+        Args:
+            renderer (Renderer): The renderer used to fill and convert the documents.
+            queue_size (int): The number of documents waiting to be written.
+            batch_size (int): The largest number of files converted at once.
+        """
+        self.renderer = renderer
+        self.batch_size = max(batch_size, 1)
+        # Документ: (задание, содержимое .docx)
+        self.write_queue: "queue.Queue[Optional[Tuple[DocumentTask, bytes]]]" = queue.Queue(queue_size)
+        self.results: List[DocumentResult] = []
+        # Последний переданный документ каждого файла, пока он не записан
+        self.queued: Dict[str, DocumentTask] = {}
+        # Файлы, ждущие конвертации: документ — (задание, время записи), книга — (None, (путь PDF, результат))
+        self.batch: Dict[str, tuple] = {}
+        self.converting: Set[str] = set()
+        self.flush = False  # книгу Excel ждет вызвавший export_workbook
+        self.closed = False
+        self.changed = threading.Condition()
+        self.writer = threading.Thread(target=self.write, daemon=True)
+        self.converter = threading.Thread(target=self.convert, daemon=True)
+        self.writer.start()
+        self.converter.start()
+
+    def submit(self, task: Optional[DocumentTask]) -> None:
+        """Fill a document and queue it for writing and conversion; waits while the queue is full.
+
+        Args:
+            task (Optional[DocumentTask]): The document to render, None is ignored.
+
+        Returns:
+            None
+        """
+        if task is None:
+            return
+
+        print(f"Создание отчета '{task.title}'...")
+        try:
+            with stage("document_fill"):
+                data = io.BytesIO()
+                self.renderer.get_template(task.template_path).render(task.replacements, data)
+        except Exception as e:
+            print(f"Ошибка: {e}")
+            self.results.append(DocumentResult(title=task.title, error=str(e)))
+            return
+        with self.changed:
+            self.queued[task.output_path] = task
+        self.write_queue.put((task, data.getvalue()))
+
+    def write(self) -> None:
+        """Save the filled documents until the pipeline is closed (writer thread)."""
+        while True:
+            item = self.write_queue.get()
+            if item is None:
+                with self.changed:
+                    self.closed = True
+                    self.changed.notify_all()
+                return
+
+            task, data = item
+            path = f"{task.output_path}.docx"
+            with self.changed:
+                if self.queued.get(task.output_path) is not task:
+                    continue  # за ним передан документ того же файла
+                del self.queued[task.output_path]
+                # Файл, который сейчас конвертируется, перезаписывается только после конвертации,
+                # а записанный ранее и еще не сконвертированный документ больше не нужен
+                self.changed.wait_for(lambda: path not in self.converting)
+                self.batch.pop(path, None)
+                self.changed.wait_for(lambda: len(self.batch) < self.batch_size)
+
+            start = time.perf_counter()
+            try:
+                with open(path, "wb") as file:
+                    file.write(data)
+            except Exception as e:
+                print(f"Ошибка: {e}")
+                self.results.append(DocumentResult(title=task.title, error=str(e), seconds=time.perf_counter() - start))
+                continue
+            with self.changed:
+                self.batch[path] = (task, time.perf_counter() - start)
+                self.changed.notify_all()
+
+    def convert(self) -> None:
+        """Export the saved files to PDF in bulk until the pipeline is closed (converter thread)."""
+        while True:
+            with self.changed:
+                self.changed.wait_for(lambda: self.closed or self.flush or len(self.batch) >= self.batch_size)
+                if self.closed and not self.batch:
+                    return
+                batch = [(task, path, extra) for path, (task, extra) in self.batch.items()]
+                self.batch.clear()
+                self.flush = False
+                self.converting.update(path for _, path, _ in batch)
+                self.changed.notify_all()
+
+            try:
+                self.convert_batch(batch)
+            finally:
+                with self.changed:
+                    self.converting.clear()
+                    self.changed.notify_all()
+
+    def convert_batch(self, batch: List[tuple]) -> None:
+        """Export a batch of saved files to PDF and record the results.
+
+        Args:
+            batch (List[tuple]): The files as (task, path of the file, time of writing or (PDF path, result)).
+
+        Returns:
+            None
+        """
+        if not batch:
+            return
+
+        files = [(path, extra[0] if task is None else f"{task.output_path}.pdf") for task, path, extra in batch]
+        start = time.perf_counter()
+        try:
+            errors = self.renderer.export_files(files)
+        except Exception as e:
+            errors = [e] * len(files)
+        share = (time.perf_counter() - start) / len(batch)  # доля каждого файла во времени пакета
+
+        for (task, path, extra), error in zip(batch, errors):
+            if task is None:
+                # Книга Excel, результат ждет вызвавший export_workbook
+                future = extra[1]
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(None)
+                continue
+
+            if error is not None:
+                print(f"Ошибка в отчете '{task.title}': {error}")
+                self.results.append(DocumentResult(title=task.title, error=str(error), seconds=extra + share))
+            else:
+                print(f"Отчет '{task.title}' создан!")
+                self.results.append(DocumentResult(title=task.title, seconds=extra + share))
+
+    def export_workbook(self, workbook_path: str, pdf_path: str) -> None:
+        """Export a saved Excel workbook to PDF together with the documents already written.
+
+        Args:
+            workbook_path (str): The path to the .xlsx file.
+            pdf_path (str): The path of the resulting PDF file.
+
+        Returns:
+            None
+
+        Raises:
+            Exception: If the workbook could not be exported.
+        """
+        future: Future = Future()
+        with self.changed:
+            self.changed.wait_for(lambda: workbook_path not in self.converting)
+            self.batch[workbook_path] = (None, (pdf_path, future))
+            self.flush = True
+            self.changed.notify_all()
+        future.result()
+
+    def wait(self) -> List[DocumentResult]:
+        """Wait until all queued documents are written and converted; the pipeline cannot be used after that.
+
+        Returns:
+            List[DocumentResult]: The outcome of every document.
+        """
+        if self.writer.is_alive():
+            self.write_queue.put(None)
+        self.writer.join()
+        self.converter.join()
+        return self.results
+
+    def close(self) -> None:
+        """Wait for the queued documents and stop the threads."""
+        self.wait()
+
+    def __enter__(self) -> "OutputPipeline":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
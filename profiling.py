@@ -0,0 +1,203 @@
+import csv
+import json
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, ContextManager, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+
+T = TypeVar("T")
+
+
+class Profiler:
+    """Wall time of the stages of a run and counters of the processed items.
+
+    Stages can be nested. Besides the total time of a stage, its own time
+    without the nested stages is kept, so the rows read lazily while the
+    AO-1 table is filled are not counted in the table layout as well.
+    """
+
+    def __init__(self) -> None:
+        # Этап: [количество вызовов, общее время, собственное время]
+        self.stages: Dict[str, List[float]] = {}
+        self.counters: Dict[str, int] = {}
+        self.stack: List[List[float]] = []
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Measure the time of a block of code as a stage.
+
+        Args:
+            name (str): The name of the stage; the times of all blocks with the same name are added up.
+        """
+        frame = [time.perf_counter(), 0.0]  # начало и время вложенных этапов
+        self.stack.append(frame)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - frame[0]
+            self.stack.pop()
+            if self.stack:
+                self.stack[-1][1] += elapsed
+            stats = self.stages.setdefault(name, [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += elapsed
+            stats[2] += elapsed - frame[1]
+
+    def timed(self, iterable: Iterable[T], name: str) -> Iterator[T]:
+        """Measure the time spent getting every item of a lazy iterable as a stage.
+
+        Args:
+            iterable (Iterable[T]): The iterable to measure.
+            name (str): The name of the stage.
+
+        Yields:
+            T: The items of the iterable.
+        """
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def add(self, name: str, seconds: float, calls: int = 1) -> None:
+        """Add the time of a stage measured elsewhere, e.g. in a worker process.
+
+        The time is not subtracted from the current stage, since it ran in parallel.
+
+        Args:
+            name (str): The name of the stage.
+            seconds (float): The measured time.
+            calls (int): The number of measured calls.
+
+        Returns:
+            None
+        """
+        stats = self.stages.setdefault(name, [0, 0.0, 0.0])
+        stats[0] += calls
+        stats[1] += seconds
+        stats[2] += seconds
+
+    def count(self, name: str, value: int = 1) -> None:
+        """Increase a counter.
+
+        Args:
+            name (str): The name of the counter.
+            value (int): The value to add.
+
+        Returns:
+            None
+        """
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the measured stages and the counters.
+
+        Returns:
+            Dict[str, Any]: {"stages": {name: {"calls", "total", "self"}}, "counters": {name: value}},
+                the stages ordered by their own time.
+        """
+        stages = sorted(self.stages.items(), key=lambda item: item[1][2], reverse=True)
+        return {
+            "stages": {
+                name: {"calls": int(calls), "total": round(total, 6), "self": round(own, 6)}
+                for name, (calls, total, own) in stages
+            },
+            "counters": dict(self.counters),
+        }
+
+    def merge(self, data: Dict[str, Any]) -> None:
+        """Add the stages and the counters of another profile, e.g. of another workbook.
+
+        Args:
+            data (Dict[str, Any]): The profile returned by to_dict.
+
+        Returns:
+            None
+        """
+        for name, stats in data.get("stages", {}).items():
+            total = self.stages.setdefault(name, [0, 0.0, 0.0])
+            total[0] += stats["calls"]
+            total[1] += stats["total"]
+            total[2] += stats["self"]
+        for name, value in data.get("counters", {}).items():
+            self.count(name, value)
+
+
+# Профилировщик текущего процесса, None — замеры выключены
+active_profiler: Optional[Profiler] = None
+
+
+@contextmanager
+def use_profiler(profiler: Optional[Profiler]) -> Iterator[Optional[Profiler]]:
+    """Record the stages and counters of a block of code with a profiler.
+
+    Args:
+        profiler (Optional[Profiler]): The profiler, None to turn the measurements off.
+
+    Yields:
+        Optional[Profiler]: The same profiler.
+    """
+    global active_profiler
+    previous = active_profiler
+    active_profiler = profiler
+    try:
+        yield profiler
+    finally:
+        active_profiler = previous
+
+
+def stage(name: str) -> ContextManager[None]:
+    """Measure a block of code as a stage of the active profiler; does nothing if profiling is off."""
+    if active_profiler is None:
+        return nullcontext()
+    return active_profiler.stage(name)
+
+
+def timed(iterable: Iterable[T], name: str) -> Iterable[T]:
+    """Measure getting the items of an iterable as a stage of the active profiler; returns it as is if profiling is off."""
+    if active_profiler is None:
+        return iterable
+    return active_profiler.timed(iterable, name)
+
+
+def add_stage_time(name: str, seconds: float) -> None:
+    """Add the time of a stage measured elsewhere to the active profiler."""
+    if active_profiler is not None:
+        active_profiler.add(name, seconds)
+
+
+def count(name: str, value: int = 1) -> None:
+    """Increase a counter of the active profiler."""
+    if active_profiler is not None:
+        active_profiler.count(name, value)
+
+
+def save_profile(path: str, total: Dict[str, Any], parts: List[Tuple[str, Dict[str, Any]]]) -> None:
+    """Save the profile of a run as JSON or CSV, by the extension of the path.
+
+    Args:
+        path (str): The path of the report (.json or .csv).
+        total (Dict[str, Any]): The profile of the whole run, as returned by Profiler.to_dict.
+        parts (List[Tuple[str, Dict[str, Any]]]): The profiles of the parts of the run (e.g., input workbooks)
+            with their names.
+
+    Returns:
+        None
+    """
+    if path.lower().endswith(".csv"):
+        with open(path, "w", encoding="utf-8", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["part", "kind", "name", "calls", "total", "self"])
+            for part, data in [("", total)] + parts:
+                for name, stats in data["stages"].items():
+                    writer.writerow([part, "stage", name, stats["calls"], stats["total"], stats["self"]])
+                for name, value in data["counters"].items():
+                    writer.writerow([part, "counter", name, value, "", ""])
+        return
+
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump({"total": total, "parts": [dict(data, name=part) for part, data in parts]},
+                  file, ensure_ascii=False, indent=2)
@@ -0,0 +1,499 @@
+import os
+import shutil
+import subprocess
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from docx_template import DocxTemplate
+from template_cache import template_cache
+from profiling import stage
+from config import SOFFICE_PATH, SOFFICE_PROFILES_DIR, CONVERTER_PROCESSES
+
+
+class Renderer:
+    """Base class of the backends that turn the filled documents into PDF.
+
+    Word templates are compiled once per process (see TemplateCache) and filled
+    in-process; the backends only convert the resulting files to PDF. A renderer is used as a
+    context manager for the whole run, so backends can keep their resources
+    open between documents.
+    """
+
+    name = ""
+    # Объекты бэкенда можно использовать только из потока, который их создал (COM)
+    thread_bound = False
+
+    def get_template(self, template_path: str) -> DocxTemplate:
+        """Get a compiled template from the template cache of the process.
+
+        Args:
+            template_path (str): The path to the .docx template.
+
+        Returns:
+            DocxTemplate: The compiled template.
+        """
+        return template_cache.load_document(template_path)
+
+    def export_workbook(self, workbook_path: str, pdf_path: str) -> None:
+        """Export the active sheet of a saved Excel workbook to PDF.
+
+        Args:
+            workbook_path (str): The path to the .xlsx file.
+            pdf_path (str): The path of the resulting PDF file.
+
+        Returns:
+            None
+        """
+        raise NotImplementedError
+
+    def export_document(self, document_path: str, pdf_path: str) -> None:
+        """Export a saved Word document to PDF.
+
+        Args:
+            document_path (str): The path to the .docx file.
+            pdf_path (str): The path of the resulting PDF file.
+
+        Returns:
+            None
+        """
+        raise NotImplementedError
+
+    def export_files(self, files: List[Tuple[str, str]]) -> List[Optional[Exception]]:
+        """Export several saved workbooks and documents to PDF.
+
+        Backends that start the office application per call convert the files
+        in bulk; by default they are exported one by one.
+
+        Args:
+            files (List[Tuple[str, str]]): The .xlsx or .docx files and the paths of their PDF files.
+
+        Returns:
+            List[Optional[Exception]]: The error of every file, None if it was exported.
+        """
+        errors: List[Optional[Exception]] = []
+        for source_path, pdf_path in files:
+            try:
+                if source_path.lower().endswith(".xlsx"):
+                    self.export_workbook(source_path, pdf_path)
+                else:
+                    self.export_document(source_path, pdf_path)
+            except Exception as e:
+                errors.append(e)
+            else:
+                errors.append(None)
+        return errors
+
+    def render_document(self, template_path: str, replacements: Dict[str, str], output_path: str) -> None:
+        """Fill a Word template with values and save it as .docx and PDF.
+
+        Args:
+            template_path (str): The path to the .docx template.
+            replacements (Dict[str, str]): Placeholders (e.g., "{{date}}") and their values.
+            output_path (str): The output path (without extension) of the resulting document.
+
+        Returns:
+            None
+
+        Raises:
+            Exception: If the document could not be rendered.
+        """
+        with stage("document_fill"):
+            self.get_template(template_path).render(replacements, f"{output_path}.docx")
+        with stage("document_pdf_export"):
+            self.export_document(f"{output_path}.docx", f"{output_path}.pdf")
+
+    def close(self) -> None:
+        """Release the resources of the backend."""
+
+    def __enter__(self) -> "Renderer":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+
+class OfficePool:
+    """Keeps Office applications running between documents.
+
+    Every application (e.g., "Word.Application") is started on first use and
+    reused for the next documents. An instance that stopped responding is
+    replaced by a new one, and an instance can be restarted after a number of
+    documents to avoid leaks in long runs.
+
+    The COM dispatch function can be replaced, so the pool can be used with a
+    fake COM object on systems without Office.
+    """
+
+    def __init__(self, dispatch: Optional[Callable[[str], Any]] = None, max_uses: Optional[int] = None) -> None:
+        """
+        Args:
+            dispatch (Optional[Callable[[str], Any]]): Function that starts an application by its ProgID,
+                win32com.client.DispatchEx by default, so every pool gets its own instance.
+            max_uses (Optional[int]): Number of documents after which an application is restarted,
+                None to keep it for the whole run.
+        """
+        self._dispatch = dispatch
+        self.max_uses = max_uses
+        self._apps: Dict[str, Any] = {}
+        self._uses: Dict[str, int] = {}
+
+    def dispatch(self, prog_id: str) -> Any:
+        """Start a new application.
+
+        Args:
+            prog_id (str): The ProgID of the application (e.g., "Word.Application").
+
+        Returns:
+            Any: The COM object of the application.
+        """
+        if self._dispatch is None:
+            import win32com.client
+            self._dispatch = win32com.client.DispatchEx
+
+        app = self._dispatch(prog_id)
+        app.Visible = False  # Открываем приложение в фоновом режиме
+        return app
+
+    @staticmethod
+    def is_alive(app: Any) -> bool:
+        """Check whether the application still responds to calls.
+
+        Args:
+            app (Any): The COM object of the application.
+
+        Returns:
+            bool: True if the application responds.
+        """
+        try:
+            app.Name
+            return True
+        except Exception:
+            return False
+
+    def get(self, prog_id: str) -> Any:
+        """Get a running application, starting or restarting it when needed.
+
+        Args:
+            prog_id (str): The ProgID of the application.
+
+        Returns:
+            Any: The COM object of the application.
+        """
+        app = self._apps.get(prog_id)
+        if app is not None and (not self.is_alive(app) or
+                                (self.max_uses is not None and self._uses[prog_id] >= self.max_uses)):
+            self.recycle(prog_id)
+            app = None
+
+        if app is None:
+            app = self.dispatch(prog_id)
+            self._apps[prog_id] = app
+            self._uses[prog_id] = 0
+
+        self._uses[prog_id] += 1
+        return app
+
+    def recycle(self, prog_id: str) -> None:
+        """Quit the application and forget it, the next call starts a new one.
+
+        Args:
+            prog_id (str): The ProgID of the application.
+
+        Returns:
+            None
+        """
+        app = self._apps.pop(prog_id, None)
+        self._uses.pop(prog_id, None)
+        if app is not None:
+            try:
+                app.Quit()
+            except Exception:
+                pass
+
+    def run(self, prog_id: str, action: Callable[[Any], Any], retries: int = 1) -> Any:
+        """Run an action with the application, retrying on a new instance if the application crashed.
+
+        Args:
+            prog_id (str): The ProgID of the application.
+            action (Callable[[Any], Any]): Function called with the COM object of the application.
+            retries (int): How many times to retry after the application crashed.
+
+        Returns:
+            Any: The result of the action.
+
+        Raises:
+            Exception: The error of the action if the application is still alive or no retries are left.
+        """
+        while True:
+            app = self.get(prog_id)
+            try:
+                return action(app)
+            except Exception:
+                if self.is_alive(app) or retries <= 0:
+                    raise
+                print(f"Приложение {prog_id} перестало отвечать, перезапуск...")
+                self.recycle(prog_id)
+                retries -= 1
+
+    def close(self) -> None:
+        """Quit all running applications."""
+        for prog_id in list(self._apps):
+            self.recycle(prog_id)
+
+    def __enter__(self) -> "OfficePool":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+
+class ComRenderer(Renderer):
+    """Renderer that drives Microsoft Excel and Word through COM automation (Windows only).
+
+    Excel and Word are started once and reused for all documents of the run.
+    Word only opens the already filled document to export it to PDF.
+    """
+
+    name = "com"
+    thread_bound = True
+
+    def __init__(self, pool: Optional[OfficePool] = None) -> None:
+        super().__init__()
+        self.pool = pool or OfficePool()
+
+    def export_workbook(self, workbook_path: str, pdf_path: str) -> None:
+        def export(excel: Any) -> None:
+            workbook = excel.Workbooks.Open(os.path.abspath(workbook_path))
+            try:
+                worksheet = workbook.ActiveSheet
+                worksheet.ExportAsFixedFormat(0, os.path.abspath(pdf_path))
+            finally:
+                workbook.Close(False)
+
+        self.pool.run("Excel.Application", export)
+
+    def export_document(self, document_path: str, pdf_path: str) -> None:
+        def export(word_app: Any) -> None:
+            # Открываем уже заполненный документ
+            doc = word_app.Documents.Open(os.path.abspath(document_path))
+            try:
+                doc.ExportAsFixedFormat(
+                    OutputFileName=os.path.abspath(pdf_path),
+                    ExportFormat=17,  # 17 соответствует wdExportFormatPDF
+                    OpenAfterExport=False,
+                    OptimizeFor=0,  # 0 соответствует wdExportOptimizeForPrint
+                    CreateBookmarks=0  # 0 соответствует wdExportCreateNoBookmarks
+                )
+            finally:
+                try:
+                    # Закрываем документ, приложение остается запущенным
+                    doc.Close(False)
+                except Exception as e:
+                    print(f"Ошибка при закрытии документа: {e}")
+
+        self.pool.run("Word.Application", export)
+
+    def close(self) -> None:
+        self.pool.close()
+
+
+class LibreOfficeRenderer(Renderer):
+    """Renderer that works without Microsoft Office.
+
+    The PDF is produced by a headless LibreOffice (soffice), so it also runs on Linux.
+    Starting LibreOffice takes most of the time of a conversion, so export_files
+    converts many files per start, split between `processes` instances.
+    """
+
+    name = "libreoffice"
+
+    def __init__(self, soffice_path: str = SOFFICE_PATH, processes: int = CONVERTER_PROCESSES,
+                 profile: Optional[str] = None) -> None:
+        """
+        Args:
+            soffice_path (str): The name or the path of the soffice executable.
+            processes (int): The number of LibreOffice instances converting files at the same time.
+            profile (Optional[str]): The name of the own user profiles of this renderer in SOFFICE_PROFILES_DIR,
+                removed on close; None to use the default profile for the first instance.
+        """
+        super().__init__()
+        self.soffice_path = shutil.which(soffice_path) or soffice_path
+        self.processes = max(processes, 1)
+        self.profile = profile
+
+    def profile_dir(self, instance: int = 0) -> Optional[str]:
+        """Get the user profile directory of an instance.
+
+        Args:
+            instance (int): The number of the instance.
+
+        Returns:
+            Optional[str]: The path of the profile, None for the default profile of LibreOffice.
+        """
+        if self.profile is None:
+            return os.path.abspath(os.path.join(SOFFICE_PROFILES_DIR, str(instance))) if instance > 0 else None
+        return os.path.abspath(os.path.join(SOFFICE_PROFILES_DIR, f"{self.profile}-{instance}"))
+
+    def soffice_command(self, sources: List[str], out_dir: str, instance: int = 0) -> List[str]:
+        """Get the command converting files to PDF.
+
+        Instances other than the first, and all instances of a renderer with
+        its own profile, get their own user profile in SOFFICE_PROFILES_DIR:
+        LibreOffice instances with the same profile cannot run at the same time.
+
+        Args:
+            sources (List[str]): The paths of the files to convert.
+            out_dir (str): The directory of the PDF files.
+            instance (int): The number of the instance running the command.
+
+        Returns:
+            List[str]: The command.
+        """
+        command = [self.soffice_path]
+        profile = self.profile_dir(instance)
+        if profile is not None:
+            command.append(f"-env:UserInstallation=file:///{profile.replace(os.sep, '/').lstrip('/')}")
+        return command + ["--headless", "--convert-to", "pdf", "--outdir", out_dir, *map(os.path.abspath, sources)]
+
+    @staticmethod
+    def converted_path(source_path: str, out_dir: str) -> str:
+        """Get the path of the PDF file LibreOffice writes for a file."""
+        return os.path.join(out_dir, f"{os.path.splitext(os.path.basename(source_path))[0]}.pdf")
+
+    def convert_to_pdf(self, source_path: str, pdf_path: str) -> None:
+        """Convert a document to PDF with headless LibreOffice.
+
+        Args:
+            source_path (str): The path to the .xlsx or .docx file.
+            pdf_path (str): The path of the resulting PDF file.
+
+        Returns:
+            None
+
+        Raises:
+            subprocess.CalledProcessError: If LibreOffice fails to convert the file.
+            RuntimeError: If LibreOffice exits without writing the PDF.
+        """
+        out_dir = os.path.dirname(os.path.abspath(pdf_path))
+        converted_path = self.converted_path(source_path, out_dir)
+        if os.path.exists(converted_path):
+            os.remove(converted_path)  # по старому PDF нельзя понять, что файл сконвертирован
+
+        subprocess.run(
+            self.soffice_command([source_path], out_dir),
+            check=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        # soffice может завершиться без ошибки, не создав PDF
+        if not os.path.exists(converted_path):
+            raise RuntimeError(f"LibreOffice не создал PDF для '{os.path.basename(source_path)}'")
+
+        if os.path.abspath(converted_path) != os.path.abspath(pdf_path):
+            os.replace(converted_path, pdf_path)
+
+    def export_workbook(self, workbook_path: str, pdf_path: str) -> None:
+        self.convert_to_pdf(workbook_path, pdf_path)
+
+    def export_document(self, document_path: str, pdf_path: str) -> None:
+        self.convert_to_pdf(document_path, pdf_path)
+
+    def export_files(self, files: List[Tuple[str, str]]) -> List[Optional[Exception]]:
+        """Export files to PDF with as few starts of LibreOffice as possible.
+
+        The files are grouped by the directory of their PDF, and every group is
+        split between the instances running at the same time. A file counts as
+        converted when its PDF appears, since LibreOffice reports no error for
+        a single file of a group.
+        """
+        # Задания для экземпляров LibreOffice: папка PDF и номера файлов
+        jobs: List[Tuple[str, List[int]]] = []
+        by_dir: Dict[str, List[int]] = {}
+        for idx, (source_path, pdf_path) in enumerate(files):
+            by_dir.setdefault(os.path.dirname(os.path.abspath(pdf_path)), []).append(idx)
+        for out_dir, indexes in by_dir.items():
+            count = min(self.processes, len(indexes))
+            jobs.extend((out_dir, indexes[part::count]) for part in range(count))
+
+        errors: List[Optional[Exception]] = [None] * len(files)
+        for idx, (source_path, pdf_path) in enumerate(files):
+            converted_path = self.converted_path(source_path, os.path.dirname(os.path.abspath(pdf_path)))
+            if os.path.exists(converted_path):
+                os.remove(converted_path)  # по старому PDF нельзя понять, что файл сконвертирован
+
+        for start in range(0, len(jobs), self.processes):
+            running = []
+            for instance, (out_dir, indexes) in enumerate(jobs[start:start + self.processes]):
+                command = self.soffice_command([files[idx][0] for idx in indexes], out_dir, instance)
+                try:
+                    running.append((subprocess.Popen(command, stdout=subprocess.DEVNULL,
+                                                     stderr=subprocess.DEVNULL), out_dir, indexes))
+                except OSError as e:
+                    for idx in indexes:
+                        errors[idx] = e
+            for process, out_dir, indexes in running:
+                returncode = process.wait()
+                for idx in indexes:
+                    source_path, pdf_path = files[idx]
+                    converted_path = self.converted_path(source_path, out_dir)
+                    if not os.path.exists(converted_path):
+                        errors[idx] = subprocess.CalledProcessError(returncode, process.args)
+                    elif os.path.abspath(converted_path) != os.path.abspath(pdf_path):
+                        os.replace(converted_path, pdf_path)
+        return errors
+
+    def close(self) -> None:
+        """Remove the own user profiles of the renderer."""
+        if self.profile is not None:
+            for instance in range(self.processes):
+                shutil.rmtree(self.profile_dir(instance), ignore_errors=True)
+
+
+class NullRenderer(Renderer):
+    """Renderer that fills the documents but does not convert them to PDF.
+
+    An empty placeholder is written instead of every PDF. Used by the benchmarks
+    and for dry runs, to measure everything except the office backend.
+    """
+
+    name = "null"
+
+    def write_placeholder(self, pdf_path: str) -> None:
+        """Write an empty PDF placeholder.
+
+        Args:
+            pdf_path (str): The path of the PDF file.
+
+        Returns:
+            None
+        """
+        with open(pdf_path, "wb"):
+            pass
+
+    def export_workbook(self, workbook_path: str, pdf_path: str) -> None:
+        self.write_placeholder(pdf_path)
+
+    def export_document(self, document_path: str, pdf_path: str) -> None:
+        self.write_placeholder(pdf_path)
+
+
+RENDERERS = {
+    "com": ComRenderer,
+    "libreoffice": LibreOfficeRenderer,
+    "null": NullRenderer,
+}
+
+
+def get_renderer(name: str) -> Renderer:
+    """Create a renderer by its name.
+
+    Args:
+        name (str): The name of the backend ("com", "libreoffice" or "null").
+
+    Returns:
+        Renderer: A new renderer instance.
+
+    Raises:
+        ValueError: If there is no backend with this name.
+    """
+    if name not in RENDERERS:
+        raise ValueError(f"Неизвестный способ создания PDF: {name}")
+    return RENDERERS[name]()
@@ -1,7 +1,12 @@
 from datetime import date
 from enum import Enum
-from typing import Optional, Union
-from pydantic import BaseModel
+from typing import Any, Dict, List, Optional, Union
+from pydantic import BaseModel, ConfigDict
+
+
+class DeferredModel(BaseModel):
+    """ Model whose validation schema is built on first use instead of at import, for a faster start """
+    model_config = ConfigDict(defer_build=True)
 
 
 class TypeCheck(str, Enum):
@@ -27,7 +32,7 @@ class TypeDocument(str, Enum):
     Cash_receipt_Daily_allowance = "Кассовый чек Суточные"
 
 
-class ChecksDefault(BaseModel):
+class ChecksDefault(DeferredModel):
     number_str: int
     type_document: TypeDocument
     id_check: Optional[Union[int, str]]
@@ -44,9 +49,93 @@ class ChecksDefault(BaseModel):
     comment: Optional[str]
 
 
-class AdditionalInfo(BaseModel):
+# Поля чека в порядке столбцов входного файла
+CHECK_FIELDS = tuple(ChecksDefault.model_fields)
+
+
+class CheckRecord:
+    """ Check of the internal pipeline
+
+    A plain slotted object with the fields of ChecksDefault. It is built from
+    values that were already converted and validated by the validation stage,
+    so creating it costs no pydantic validation.
+    """
+    __slots__ = CHECK_FIELDS
+
+    def __init__(self, number_str: int, type_document: TypeDocument, id_check: Optional[Union[int, str]],
+                 date: Optional[date], sum_check: float, type: TypeCheck, counterparty: Optional[str],
+                 counterparty_participant: Optional[Union[int, str]], counterparty_post: Optional[str],
+                 meeting_place: Optional[str], medication: Optional[str], topic: Optional[str],
+                 name_present: Optional[str], comment: Optional[str]) -> None:
+        self.number_str = number_str
+        self.type_document = type_document
+        self.id_check = id_check
+        self.date = date
+        self.sum_check = sum_check
+        self.type = type
+        self.counterparty = counterparty
+        self.counterparty_participant = counterparty_participant
+        self.counterparty_post = counterparty_post
+        self.meeting_place = meeting_place
+        self.medication = medication
+        self.topic = topic
+        self.name_present = name_present
+        self.comment = comment
+
+    @classmethod
+    def from_model(cls, check: ChecksDefault) -> "CheckRecord":
+        return cls(*(getattr(check, field) for field in CHECK_FIELDS))
+
+    def values(self) -> tuple:
+        return tuple(getattr(self, field) for field in CHECK_FIELDS)
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{field}={getattr(self, field)!r}" for field in CHECK_FIELDS)
+        return f"CheckRecord({fields})"
+
+
+class AdditionalInfo(DeferredModel):
     employee: str
     report_month: date
     date_report: date
     post: str
-    department: str
\ No newline at end of file
+    department: str
+
+
+class DocumentTask(DeferredModel):
+    """ Additional document to render from a Word template """
+    title: str
+    template_path: str
+    replacements: Dict[str, Any]
+    output_path: str
+
+
+class DocumentResult(DeferredModel):
+    """ Outcome of rendering an additional document """
+    title: str
+    error: Optional[str] = None
+    skipped: bool = False
+    seconds: float = 0.0
+
+
+class RowError(DeferredModel):
+    """ Problem found in a check row of the input file """
+    row: int
+    id_check: Optional[str] = None
+    field: str
+    message: str
+
+
+class WorkbookResult(DeferredModel):
+    """ Outcome of processing an input workbook """
+    input_path: str
+    output_path: str
+    checks: int = 0
+    documents: List[DocumentResult] = []
+    row_errors: List[RowError] = []
+    # Суммы чеков в копейках: всего и по видам чеков и документов, см. MoneyTotals.to_dict
+    totals: Optional[Dict[str, Any]] = None
+    bundle_path: Optional[str] = None
+    error: Optional[str] = None
+    seconds: float = 0.0
+    profile: Optional[Dict[str, Any]] = None
@@ -0,0 +1,277 @@
+from __future__ import annotations
+
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from multiprocessing.connection import Client, Connection, Listener
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+from config import RENDERER, REPORT_WORKERS, SERVER_ADDRESS, SERVER_KEY_FILE, SERVER_CONCURRENCY, SERVER_QUEUE_SIZE
+
+if TYPE_CHECKING:
+    from renderers import Renderer
+    from schemas import WorkbookResult
+
+
+def send_message(conn: Connection, message: Dict[str, Any]) -> None:
+    """Send a message as JSON.
+
+    Args:
+        conn (Connection): The connection.
+        message (Dict[str, Any]): The message.
+
+    Returns:
+        None
+    """
+    conn.send_bytes(json.dumps(message, ensure_ascii=False).encode("utf-8"))
+
+
+def receive_message(conn: Connection) -> Dict[str, Any]:
+    """Receive a message sent by send_message.
+
+    Args:
+        conn (Connection): The connection.
+
+    Returns:
+        Dict[str, Any]: The message.
+    """
+    return json.loads(conn.recv_bytes().decode("utf-8"))
+
+
+def read_key(key_file: str = SERVER_KEY_FILE) -> Optional[bytes]:
+    """Read the connection key written by a running server.
+
+    Args:
+        key_file (str): The path of the key file.
+
+    Returns:
+        Optional[bytes]: The key, None if no server was started.
+    """
+    try:
+        with open(key_file, "rb") as file:
+            return file.read()
+    except FileNotFoundError:
+        return None
+
+
+def write_key(key_file: str = SERVER_KEY_FILE) -> bytes:
+    """Create a new random connection key readable only by the user.
+
+    Args:
+        key_file (str): The path of the key file.
+
+    Returns:
+        bytes: The key.
+    """
+    key = os.urandom(32)
+    os.makedirs(os.path.dirname(key_file), exist_ok=True)
+    if os.path.exists(key_file):
+        os.remove(key_file)
+    fd = os.open(key_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "wb") as file:
+        file.write(key)
+    return key
+
+
+class Job:
+    """A request of a client waiting in the queue of the server."""
+
+    def __init__(self, conn: Connection, paths: List[str], path_save: str, force: bool) -> None:
+        """
+        Args:
+            conn (Connection): The connection of the client, the result is sent to it.
+            paths (List[str]): Files, directories or glob patterns of the input workbooks.
+            path_save (str): The path directory to save the reports.
+            force (bool): Create all reports, even the ones that did not change since the previous run.
+        """
+        self.conn = conn
+        self.paths = paths
+        self.path_save = path_save
+        self.force = force
+
+
+class ReportServer:
+    """Resident process creating reports for the clients (see client.py).
+
+    The renderer with the running Office applications and the parsed
+    templates stay loaded between jobs, so a job only costs the work on its own
+    workbooks. LibreOffice is started for every batch of a job, see
+    LibreOfficeRenderer.export_files. Jobs come over a local socket (a named pipe on Windows)
+    protected by a random key, wait in a bounded queue and are processed by
+    `concurrency` threads, each with its own renderer; jobs writing to the
+    same directory are processed one after another. A job with several
+    workbooks and workers > 1 runs in worker processes with their own
+    renderers (see main.run_batch) and does not use the loaded ones.
+    """
+
+    def __init__(self, run_batch: Callable[..., List[WorkbookResult]], address: str = SERVER_ADDRESS,
+                 key_file: str = SERVER_KEY_FILE, concurrency: int = SERVER_CONCURRENCY,
+                 queue_size: int = SERVER_QUEUE_SIZE, renderer_name: str = RENDERER,
+                 workers: int = REPORT_WORKERS) -> None:
+        """
+        Args:
+            run_batch (Callable[..., List[WorkbookResult]]): Processes the workbooks of a job, main.run_batch.
+            address (str): The path of the socket or the name of the pipe.
+            key_file (str): The path of the connection key file.
+            concurrency (int): The number of jobs processed at the same time.
+            queue_size (int): The number of waiting jobs, a client is refused when the queue is full.
+            renderer_name (str): The name of the renderer backend.
+            workers (int): The number of worker processes of a job, see run_batch.
+        """
+        self.run_batch = run_batch
+        self.address = address
+        self.key_file = key_file
+        self.concurrency = max(concurrency, 1)
+        self.renderer_name = renderer_name
+        self.workers = workers
+        self.jobs: "queue.Queue[Optional[Job]]" = queue.Queue(maxsize=queue_size)
+        self.key: Optional[bytes] = None
+        self.listener: Optional[Listener] = None
+        self.stopping = threading.Event()
+        self.dir_locks: Dict[str, threading.Lock] = {}
+        self.dir_locks_lock = threading.Lock()
+
+    def dir_lock(self, path_save: str) -> threading.Lock:
+        """Get the lock of an output directory.
+
+        Args:
+            path_save (str): The path directory to save the reports.
+
+        Returns:
+            threading.Lock: The lock of the directory.
+        """
+        path = os.path.normcase(os.path.abspath(path_save))
+        with self.dir_locks_lock:
+            return self.dir_locks.setdefault(path, threading.Lock())
+
+    def work(self) -> None:
+        """Process jobs from the queue until the server stops."""
+        from renderers import get_renderer
+
+        com = self.renderer_name == "com"
+        if com:
+            import pythoncom
+            pythoncom.CoInitialize()  # COM нужно инициализировать в каждом потоке
+
+        try:
+            with get_renderer(self.renderer_name) as renderer:
+                while True:
+                    job = self.jobs.get()
+                    if job is None:
+                        break
+                    self.process(job, renderer)
+        finally:
+            if com:
+                pythoncom.CoUninitialize()
+
+    def process(self, job: Job, renderer: Renderer) -> None:
+        """Process a job and send its result to the client.
+
+        Args:
+            job (Job): The job.
+            renderer (Renderer): The open renderer of the worker thread.
+
+        Returns:
+            None
+        """
+        start = time.perf_counter()
+        print(f"Задание: {', '.join(job.paths)} -> {job.path_save}")
+        try:
+            with self.dir_lock(job.path_save):
+                results = self.run_batch(job.paths, job.path_save, self.workers, self.renderer_name,
+                                         job.force, renderer=renderer)
+            message = {"status": "done", "results": [result.model_dump(mode="json") for result in results]}
+        except Exception as e:
+            print(f"Ошибка при выполнении задания: {e}")
+            message = {"status": "error", "error": str(e)}
+        print(f"Задание выполнено за {time.perf_counter() - start:.1f} с")
+
+        try:
+            send_message(job.conn, message)
+        except OSError:
+            print("Клиент отключился, не дождавшись результата")
+        finally:
+            job.conn.close()
+
+    def handle(self, conn: Connection) -> None:
+        """Read the request of a client and queue it.
+
+        Args:
+            conn (Connection): The connection of the client.
+
+        Returns:
+            None
+        """
+        try:
+            request = receive_message(conn)
+            command = request.get("command")
+            if command == "ping":
+                send_message(conn, {"status": "ok", "queued": self.jobs.qsize()})
+            elif command == "stop":
+                send_message(conn, {"status": "stopping"})
+                self.stop()
+            elif command == "run":
+                job = Job(conn, list(request["paths"]), request["path_save"], bool(request.get("force", False)))
+                try:
+                    self.jobs.put_nowait(job)
+                except queue.Full:
+                    send_message(conn, {"status": "busy"})
+                else:
+                    send_message(conn, {"status": "queued", "position": self.jobs.qsize()})
+                    return  # соединение закроет поток, выполнивший задание
+            else:
+                send_message(conn, {"status": "error", "error": f"Неизвестная команда: {command}"})
+        except (OSError, EOFError, ValueError, KeyError, TypeError) as e:
+            print(f"Ошибка запроса клиента: {e}")
+        conn.close()
+
+    def stop(self) -> None:
+        """Stop accepting jobs; the queued jobs are still processed."""
+        if self.stopping.is_set():
+            return
+        self.stopping.set()
+        # accept() не прерывается закрытием сокета, поэтому подключаемся к себе
+        try:
+            Client(self.address, authkey=self.key).close()
+        except (OSError, EOFError):
+            pass
+
+    def serve_forever(self) -> None:
+        """Accept jobs until a client sends the stop command."""
+        if sys.platform != "win32" and os.path.exists(self.address):
+            os.remove(self.address)  # сокет, оставшийся от прошлого запуска
+        self.key = write_key(self.key_file)
+        self.listener = Listener(self.address, authkey=self.key)
+
+        threads = [threading.Thread(target=self.work, daemon=True) for _ in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        print(f"Сервер отчетов запущен: {self.address}")
+
+        try:
+            while not self.stopping.is_set():
+                try:
+                    conn = self.listener.accept()
+                except OSError as e:
+                    if self.stopping.is_set():
+                        break
+                    print(f"Ошибка подключения клиента: {e}")
+                    continue
+                if self.stopping.is_set():
+                    conn.close()
+                    break
+                threading.Thread(target=self.handle, args=(conn,), daemon=True).start()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.listener.close()
+            if os.path.exists(self.key_file):
+                os.remove(self.key_file)
+            print("Сервер отчетов останавливается, выполняются задания из очереди...")
+            for _ in threads:
+                self.jobs.put(None)
+            for thread in threads:
+                thread.join()
+            print("Сервер отчетов остановлен.")
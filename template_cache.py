@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import os
+import pickle
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Tuple
+from docx_template import DocxTemplate
+from manifest import file_hash, hash_values
+from config import TEMPLATE_CACHE_DIR
+
+if TYPE_CHECKING:
+    from openpyxl.workbook.workbook import Workbook
+
+
+# Меняется при изменении формата кеша, чтобы старые файлы кеша не читались
+CACHE_VERSION = 1
+
+
+def restore_dimensions(workbook: Workbook) -> Workbook:
+    """Restore the row and column dimensions of an unpickled workbook.
+
+    The dimensions of a worksheet are defaultdicts creating missing rows and
+    columns with methods of the worksheet; pickle does not keep the factory, so
+    a row without its own height would raise KeyError.
+
+    Args:
+        workbook (Workbook): The unpickled workbook.
+
+    Returns:
+        Workbook: The same workbook.
+    """
+    for sheet in workbook.worksheets:
+        sheet.row_dimensions.worksheet = sheet
+        sheet.row_dimensions.default_factory = sheet._add_row
+        sheet.column_dimensions.worksheet = sheet
+        sheet.column_dimensions.default_factory = sheet._add_column
+    return workbook
+
+
+class CachedTemplate:
+    """A parsed template together with the state of its file."""
+
+    def __init__(self, stat: Tuple[int, int], digest: str, data: bytes, master: Any) -> None:
+        """
+        Args:
+            stat (Tuple[int, int]): The mtime (ns) and the size of the template file.
+            digest (str): The SHA-256 of the template file.
+            data (bytes): The pickled parsed template.
+            master (Any): The parsed template, never modified.
+        """
+        self.stat = stat
+        self.digest = digest
+        self.data = data
+        self.master = master
+
+
+class TemplateCache:
+    """Templates parsed once and kept in memory and in pickled files on disk.
+
+    A template is parsed on first use, later requests get a copy of the
+    master unpickled from memory, which is much faster than parsing the file
+    again. The pickled master is also saved to cache_dir under the hash of
+    the template, so the next run skips parsing as well. A template is read
+    again when the mtime or the size of its file change and the content is
+    different.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = TEMPLATE_CACHE_DIR) -> None:
+        """
+        Args:
+            cache_dir (Optional[str]): The directory of the pickled templates, None to keep them only in memory.
+        """
+        self.cache_dir = cache_dir
+        self.entries: Dict[Tuple[str, str], CachedTemplate] = {}
+
+    def get(self, kind: str, path: str, parse: Callable[[str], Any]) -> CachedTemplate:
+        """Get a template, parsing it only if it is not in memory or on disk.
+
+        Args:
+            kind (str): The kind of the template, part of the cache key (e.g., "xlsx").
+            path (str): The path to the template file.
+            parse (Callable[[str], Any]): Reads the template file.
+
+        Returns:
+            CachedTemplate: The parsed template.
+        """
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        stat = (stat.st_mtime_ns, stat.st_size)
+
+        entry = self.entries.get((kind, path))
+        if entry is not None and entry.stat == stat:
+            return entry
+
+        digest = file_hash(path)
+        if entry is not None and entry.digest == digest:
+            # Файл сохранили заново без изменений
+            entry.stat = stat
+            return entry
+
+        cached = self.read_disk(kind, digest)
+        if cached is not None:
+            data, master = cached
+        else:
+            master = parse(path)
+            data = pickle.dumps(master, protocol=pickle.HIGHEST_PROTOCOL)
+            self.write_disk(kind, digest, data)
+
+        entry = CachedTemplate(stat, digest, data, master)
+        self.entries[(kind, path)] = entry
+        return entry
+
+    def disk_path(self, kind: str, digest: str) -> str:
+        """Get the path of a pickled template in cache_dir.
+
+        The library version is part of the name: pickles of openpyxl objects
+        cannot be read by another version.
+
+        Args:
+            kind (str): The kind of the template.
+            digest (str): The SHA-256 of the template file.
+
+        Returns:
+            str: The path of the pickled template.
+        """
+        import openpyxl
+
+        key = hash_values(CACHE_VERSION, kind, digest, openpyxl.__version__)
+        return os.path.join(self.cache_dir, f"{kind}-{key}.pickle")
+
+    def read_disk(self, kind: str, digest: str) -> Optional[Tuple[bytes, Any]]:
+        """Read a pickled template saved by a previous run.
+
+        Args:
+            kind (str): The kind of the template.
+            digest (str): The SHA-256 of the template file.
+
+        Returns:
+            Optional[Tuple[bytes, Any]]: The pickled and the unpickled template, None if it is not cached
+                or cannot be read.
+        """
+        if self.cache_dir is None:
+            return None
+        try:
+            with open(self.disk_path(kind, digest), "rb") as file:
+                data = file.read()
+            return data, pickle.loads(data)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Кеш шаблона поврежден, шаблон будет прочитан заново: {e}")
+            return None
+
+    def write_disk(self, kind: str, digest: str, data: bytes) -> None:
+        """Save a pickled template for the next runs; errors are only reported.
+
+        Args:
+            kind (str): The kind of the template.
+            digest (str): The SHA-256 of the template file.
+            data (bytes): The pickled template.
+
+        Returns:
+            None
+        """
+        if self.cache_dir is None:
+            return
+        path = self.disk_path(kind, digest)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(temp_path, "wb") as file:
+                file.write(data)
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"Не удалось сохранить кеш шаблона {path}: {e}")
+
+    def load_workbook(self, path: str) -> Workbook:
+        """Get a copy of an Excel template that can be filled and saved.
+
+        Args:
+            path (str): The path to the .xlsx template.
+
+        Returns:
+            Workbook: A new copy of the template.
+        """
+        from openpyxl import load_workbook
+
+        return restore_dimensions(pickle.loads(self.get("xlsx", path, load_workbook).data))
+
+    def load_document(self, path: str) -> DocxTemplate:
+        """Get a compiled Word template.
+
+        DocxTemplate is not modified by rendering, so the master itself is
+        returned instead of a copy.
+
+        Args:
+            path (str): The path to the .docx template.
+
+        Returns:
+            DocxTemplate: The compiled template.
+        """
+        return self.get("docx", path, DocxTemplate).master
+
+
+# Кеш шаблонов процесса, общий для всех отчетов пакета
+template_cache = TemplateCache()
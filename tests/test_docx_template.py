@@ -0,0 +1,90 @@
+import io
+import zipfile
+from typing import List
+from xml.etree import ElementTree
+from docx_template import DocxTemplate, compile_part
+
+
+W = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+
+
+def document(body: str) -> str:
+    """Wrap paragraphs into the XML of a document part."""
+    return (f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            f'<w:document xmlns:w="{W}"><w:body>{body}</w:body></w:document>')
+
+
+def paragraphs(xml: str) -> List[str]:
+    """Get the text of every paragraph, failing if the XML is not well-formed."""
+    root = ElementTree.fromstring(xml.encode("utf-8"))
+    return [
+        "".join(text.text or "" for text in paragraph.iter(f"{{{W}}}t"))
+        for paragraph in root.iter(f"{{{W}}}p")
+    ]
+
+
+def test_placeholder_split_across_runs() -> None:
+    xml = document(
+        '<w:p><w:r><w:t>Дата: {{da</w:t></w:r>'
+        '<w:r><w:rPr><w:b/></w:rPr><w:t>te</w:t></w:r>'
+        '<w:r><w:t>}} г.</w:t></w:r></w:p>'
+    )
+    part = compile_part(xml)
+
+    assert part.keys == ["{{date}}"]
+    rendered = part.render({"{{date}}": "1 мая 2025"})
+    assert paragraphs(rendered) == ["Дата: 1 мая 2025 г."]
+    assert "<w:rPr><w:b/></w:rPr>" in rendered  # разметка соседних элементов сохраняется
+
+
+def test_placeholder_not_joined_across_paragraphs() -> None:
+    xml = document('<w:p><w:r><w:t>{{da</w:t></w:r></w:p><w:p><w:r><w:t>te}}</w:t></w:r></w:p>')
+    part = compile_part(xml)
+
+    assert part.keys == []
+    assert part.render({}) == xml
+
+
+def test_several_placeholders_and_untouched_text() -> None:
+    xml = document(
+        '<w:p><w:r><w:t>{{a}} и {{b}}</w:t></w:r></w:p>'
+        '<w:p><w:r><w:t xml:space="preserve"> Без плейсхолдеров </w:t></w:r></w:p>'
+    )
+    part = compile_part(xml)
+
+    assert part.keys == ["{{a}}", "{{b}}"]
+    assert paragraphs(part.render({"{{a}}": "1", "{{b}}": "2"})) == ["1 и 2", " Без плейсхолдеров "]
+    assert '<w:t xml:space="preserve"> Без плейсхолдеров </w:t>' in part.render({})
+
+
+def test_escaping(tmp_path) -> None:
+    template_path = str(tmp_path / "template.docx")
+    with zipfile.ZipFile(template_path, "w") as template:
+        template.writestr("word/document.xml", document(
+            '<w:p><w:r><w:t>Рога &amp; копыта: {{na</w:t></w:r><w:r><w:t>me}}</w:t></w:r></w:p>'
+        ))
+
+    output = io.BytesIO()
+    DocxTemplate(template_path).render({"{{name}}": 'ООО "А & Б" <1>'}, output)
+    with zipfile.ZipFile(output) as result:
+        xml = result.read("word/document.xml").decode("utf-8")
+
+    assert paragraphs(xml) == ['Рога & копыта: ООО "А & Б" <1>']
+
+
+def test_unknown_placeholders(tmp_path) -> None:
+    xml = document('<w:p><w:r><w:t>{{known}} {{unknown}} {{a&lt;b}}</w:t></w:r></w:p>')
+    part = compile_part(xml)
+
+    assert paragraphs(part.render({"{{known}}": "да"})) == ["да {{unknown}} {{a<b}}"]
+
+    template_path = str(tmp_path / "template.docx")
+    with zipfile.ZipFile(template_path, "w") as template:
+        template.writestr("word/document.xml", xml)
+    output = io.BytesIO()
+    template = DocxTemplate(template_path)
+    template.render({"{{known}}": "да", "{{missing}}": "нет"}, output)
+
+    assert "{{missing}}" not in template.index
+    with zipfile.ZipFile(output) as result:
+        assert paragraphs(result.read("word/document.xml").decode("utf-8")) == ["да {{unknown}} {{a<b}}"]
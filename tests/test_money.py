@@ -0,0 +1,52 @@
+import pytest
+from money import to_kopecks, split_kopecks, format_amount
+from utils import create_kopecks_str
+
+
+@pytest.mark.parametrize("amount, kopecks", [
+    (0, 0),
+    (0.29, 29),  # хранится как 0.28999...
+    (1234.5, 123450),
+    (129023.2, 12902320),
+    (0.125, 13),  # половина копейки округляется вверх, а не к четному
+    (0.135, 14),
+    (1.005, 101),
+    (-1.5, -150),
+    (-0.125, -13),
+])
+def test_to_kopecks(amount: float, kopecks: int) -> None:
+    assert to_kopecks(amount) == kopecks
+
+
+@pytest.mark.parametrize("kopecks, parts", [
+    (0, (0, 0)),
+    (150, (1, 50)),
+    (12902320, (129023, 20)),
+    (-150, (-1, 50)),
+    (-100, (-1, 0)),
+    (-50, (0, 50)),
+])
+def test_split_kopecks(kopecks: int, parts: tuple) -> None:
+    assert split_kopecks(kopecks) == parts
+
+
+@pytest.mark.parametrize("kopecks, text", [
+    (0, "0.00"),
+    (5, "0.05"),
+    (123450, "1234.50"),
+    (-150, "-1.50"),
+    (-50, "-0.50"),
+    (-5, "-0.05"),
+])
+def test_format_amount(kopecks: int, text: str) -> None:
+    assert format_amount(kopecks) == text
+
+
+@pytest.mark.parametrize("amount, text", [
+    (5000.0, "00"),
+    (1.5, "50"),
+    (-1.5, "-50"),
+    (-0.5, "-50"),
+])
+def test_create_kopecks_str(amount: float, text: str) -> None:
+    assert create_kopecks_str(amount) == text
@@ -0,0 +1,115 @@
+from typing import List
+import pytest
+from renderers import OfficePool
+
+
+class FakeApp:
+    """Stand-in for a COM Office application: it can crash and remembers whether it was quit."""
+
+    def __init__(self, prog_id: str) -> None:
+        self.prog_id = prog_id
+        self.Visible = True
+        self.crashed = False
+        self.quit = False
+
+    @property
+    def Name(self) -> str:
+        if self.crashed:
+            raise OSError("RPC server is unavailable")
+        return self.prog_id
+
+    def Quit(self) -> None:
+        if self.crashed:
+            raise OSError("RPC server is unavailable")
+        self.quit = True
+
+
+class FakeDispatch:
+    """Replaces win32com.client.DispatchEx and records every started application."""
+
+    def __init__(self) -> None:
+        self.apps: List[FakeApp] = []
+
+    def __call__(self, prog_id: str) -> FakeApp:
+        app = FakeApp(prog_id)
+        self.apps.append(app)
+        return app
+
+
+def test_reuses_application() -> None:
+    dispatch = FakeDispatch()
+    pool = OfficePool(dispatch)
+
+    first = pool.get("Word.Application")
+    second = pool.get("Word.Application")
+
+    assert first is second
+    assert len(dispatch.apps) == 1
+    assert first.Visible is False
+
+
+def test_recycles_dead_instance() -> None:
+    dispatch = FakeDispatch()
+    pool = OfficePool(dispatch)
+
+    first = pool.get("Word.Application")
+    first.crashed = True
+    second = pool.get("Word.Application")
+
+    assert second is not first
+    assert len(dispatch.apps) == 2
+
+
+def test_run_retries_on_new_instance_after_crash() -> None:
+    dispatch = FakeDispatch()
+    pool = OfficePool(dispatch)
+    calls = []
+
+    def action(app: FakeApp) -> str:
+        calls.append(app)
+        if len(calls) == 1:
+            app.crashed = True  # приложение упало посреди документа
+            raise OSError("RPC server is unavailable")
+        return "ok"
+
+    assert pool.run("Word.Application", action) == "ok"
+    assert len(dispatch.apps) == 2
+    assert calls == dispatch.apps
+
+
+def test_run_raises_error_of_live_instance() -> None:
+    dispatch = FakeDispatch()
+    pool = OfficePool(dispatch)
+
+    def action(app: FakeApp) -> None:
+        raise ValueError("bad document")
+
+    with pytest.raises(ValueError):
+        pool.run("Word.Application", action)
+    assert len(dispatch.apps) == 1  # живое приложение не перезапускается
+
+
+def test_restarts_after_max_uses() -> None:
+    dispatch = FakeDispatch()
+    pool = OfficePool(dispatch, max_uses=2)
+
+    apps = [pool.get("Excel.Application") for _ in range(5)]
+
+    assert len(dispatch.apps) == 3
+    assert apps == [dispatch.apps[0]] * 2 + [dispatch.apps[1]] * 2 + [dispatch.apps[2]]
+    assert dispatch.apps[0].quit and dispatch.apps[1].quit
+    assert not dispatch.apps[2].quit
+
+
+def test_close_quits_all_instances() -> None:
+    dispatch = FakeDispatch()
+    with OfficePool(dispatch) as pool:
+        pool.get("Excel.Application")
+        pool.get("Word.Application")
+        dead = pool.get("Word.Application")
+        dead.crashed = True
+
+    excel, word = dispatch.apps
+    assert excel.quit
+    assert word.crashed  # упавшее приложение не мешает закрыть остальные
+    assert pool.get("Excel.Application") is not excel  # после close приложения запускаются заново
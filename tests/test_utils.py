@@ -0,0 +1,79 @@
+from copy import copy
+from typing import Callable, Dict, Tuple
+from openpyxl import Workbook, load_workbook
+from openpyxl.styles import Alignment, Border, Side, numbers
+from openpyxl.worksheet.worksheet import Worksheet
+from utils import merge_new_cells, make_style
+
+
+BORDER = Border(left=Side(border_style="thin", color="000000"), bottom=Side(border_style="thin", color="000000"))
+ALIGNMENT = Alignment(vertical="top", horizontal="right", wrap_text=True)
+RANGES = ["B3:C3", "E3:G3", "B4:C4", "E4:G4"]
+
+
+def fill_sheet(merge: Callable[[Worksheet], None], style: Callable[[Worksheet], None]) -> Workbook:
+    """Fill a sheet the way fill_report does: merge the cells of the rows, then write and style them."""
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.merge_cells("A1:D1")
+    sheet["E5"].border = BORDER  # у первой ячейки объединения уже есть стиль
+    merge(sheet)
+    for row in (3, 4):
+        sheet.cell(row=row, column=2, value=f"Текст {row}")
+        sheet.cell(row=row, column=5, value=row * 10.5)
+    style(sheet)
+    return workbook
+
+
+def merge_public(sheet: Worksheet) -> None:
+    for cell_range in RANGES + ["E5:F5"]:
+        sheet.merge_cells(cell_range)
+
+
+def merge_fast(sheet: Worksheet) -> None:
+    merge_new_cells(sheet, RANGES + ["E5:F5"])
+
+
+def style_public(sheet: Worksheet) -> None:
+    for row in (3, 4):
+        for column in range(2, 8):
+            cell = sheet.cell(row=row, column=column)
+            cell.border = BORDER
+            if column >= 5:
+                cell.alignment = ALIGNMENT
+                cell.number_format = numbers.FORMAT_NUMBER_00 if column == 5 else "# ##0.00 ₽"
+
+
+def style_fast(sheet: Worksheet) -> None:
+    workbook = sheet.parent
+    styles = {
+        column: make_style(workbook, BORDER) if column < 5 else make_style(
+            workbook, BORDER, ALIGNMENT, numbers.FORMAT_NUMBER_00 if column == 5 else "# ##0.00 ₽")
+        for column in range(2, 8)
+    }
+    for row in (3, 4):
+        for column, style in styles.items():
+            sheet.cell(row=row, column=column)._style = copy(style)
+
+
+def describe(sheet: Worksheet) -> Tuple[list, Dict[str, tuple]]:
+    """Get the merged ranges and the type, value and style of every cell of a sheet."""
+    cells = {
+        cell.coordinate: (type(cell).__name__, cell.value, copy(cell.border), copy(cell.alignment),
+                          cell.number_format, copy(cell.font), copy(cell.fill), copy(cell.protection))
+        for row in sheet.iter_rows(min_row=1, max_row=5, max_col=8)
+        for cell in row
+    }
+    return sorted(str(cell_range) for cell_range in sheet.merged_cells.ranges), cells
+
+
+def test_merged_and_styled_cells_match_public_api(tmp_path) -> None:
+    expected = fill_sheet(merge_public, style_public)
+    actual = fill_sheet(merge_fast, style_fast)
+
+    assert describe(actual.active) == describe(expected.active)
+
+    expected.save(tmp_path / "expected.xlsx")
+    actual.save(tmp_path / "actual.xlsx")
+    assert (describe(load_workbook(tmp_path / "actual.xlsx").active)
+            == describe(load_workbook(tmp_path / "expected.xlsx").active))
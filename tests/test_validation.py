@@ -0,0 +1,28 @@
+import pytest
+from validation import CHECK_COLUMNS, map_columns
+
+
+def test_template_header() -> None:
+    assert map_columns([title for _, title in CHECK_COLUMNS]) == tuple(range(len(CHECK_COLUMNS)))
+
+
+def test_aliases_in_any_order() -> None:
+    columns = map_columns(["Примечание", None, "Сумма, руб.", "Дата документа", "Лишний столбец", "№ чека"])
+    found = {field: idx for (field, _), idx in zip(CHECK_COLUMNS, columns) if idx is not None}
+    assert found == {"comment": 0, "sum_check": 2, "date": 3, "id_check": 5}
+
+
+def test_partial_title_is_not_matched() -> None:
+    columns = dict(zip((field for field, _ in CHECK_COLUMNS), map_columns(["Дата чека", "Дата", "Должность", "Место"])))
+    assert columns["date"] == 0
+    assert columns["counterparty_post"] is None
+    assert columns["meeting_place"] is None
+
+
+def test_ambiguous_columns() -> None:
+    with pytest.raises(ValueError, match="Дата чека"):
+        map_columns(["Дата чека", "Сумма", "Дата документа"])
+
+
+def test_unrecognized_header() -> None:
+    assert map_columns(["a", "b"]) == tuple(range(len(CHECK_COLUMNS)))
@@ -0,0 +1,78 @@
+import pytest
+from openpyxl import Workbook, load_workbook
+from openpyxl.styles import Font, Border, Side, numbers
+from xlsx_stream import CachedFormula, RowSpool, fill_cached_values, splice_rows
+
+
+def make_skeleton(path: str) -> Workbook:
+    """Save a small workbook with a header, a merged title and a total row below an empty table."""
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet["A1"] = "Отчет"
+    sheet.merge_cells("A1:C1")
+    sheet["A2"] = "Номер"
+    sheet["B2"] = "Сумма"
+    sheet["A7"] = "Итого"
+    sheet["B7"] = "=SUBTOTAL(9,B3:B6)"
+    workbook.save(path)
+    return workbook
+
+
+def test_fill_cached_values() -> None:
+    xml = '<c r="B7" s="1"><f>SUBTOTAL(9,B3:B6)</f><v/></c><c r="C7"><f>A1</f><v/></c>'
+    filled = fill_cached_values(xml, {"B7": 12.5})
+    assert '<c r="B7" s="1"><f>SUBTOTAL(9,B3:B6)</f><v>12.5</v></c>' in filled
+    assert '<c r="C7"><f>A1</f><v/></c>' in filled  # без значения остается как есть
+    assert fill_cached_values(xml, {}) == xml
+
+
+def test_splice_rows(tmp_path) -> None:
+    skeleton_path = str(tmp_path / "skeleton.xlsx")
+    output_path = str(tmp_path / "report.xlsx")
+    workbook = make_skeleton(skeleton_path)
+    sheet = workbook.active
+
+    border = Border(bottom=Side(border_style="thin", color="000000"))
+    # Стиль регистрируется в книге через ячейку вне таблицы
+    sheet["D1"].font = Font(bold=True)
+    sheet["D1"].border = border
+    sheet["D1"].number_format = numbers.FORMAT_NUMBER_00
+    bold = sheet["D1"].style_id
+    workbook.save(skeleton_path)
+
+    with RowSpool(sheet) as spool:
+        spool.write_row(3, [(1, bold, 1), (2, bold, 10.25), (3, bold, " текст <&> ")], {"ht": "23", "customHeight": "1"})
+        spool.write_row(4, [(1, bold, 2), (2, bold, 2.25), (3, bold, None)], {})
+        spool.write_row(5, [(1, bold, "Итого"), (2, bold, CachedFormula("SUBTOTAL(9,B3:B4)", 12.5))], {})
+        splice_rows(skeleton_path, sheet.path.lstrip("/"), spool, ["C3:D3", "C4:D4"], 2, output_path,
+                    {"B7": 12.5})
+
+    result = load_workbook(output_path).active
+    assert [[cell.value for cell in row] for row in result.iter_rows(min_row=2, max_row=7, max_col=3)] == [
+        ["Номер", "Сумма", None],
+        [1, 10.25, " текст <&> "],
+        [2, 2.25, None],
+        ["Итого", "=SUBTOTAL(9,B3:B4)", None],
+        [None, None, None],
+        ["Итого", "=SUBTOTAL(9,B3:B6)", None],
+    ]
+    assert sorted(str(cell_range) for cell_range in result.merged_cells.ranges) == ["A1:C1", "C3:D3", "C4:D4"]
+    assert result.row_dimensions[3].height == 23
+    for ref in ("A3", "B4", "C4", "B5"):
+        assert result[ref].font.bold
+        assert result[ref].border.bottom.style == "thin"
+        assert result[ref].number_format == numbers.FORMAT_NUMBER_00
+
+    values = load_workbook(output_path, data_only=True).active
+    assert values["B5"].value == 12.5
+    assert values["B7"].value == 12.5
+
+
+def test_splice_rows_existing_row(tmp_path) -> None:
+    skeleton_path = str(tmp_path / "skeleton.xlsx")
+    sheet = make_skeleton(skeleton_path).active
+
+    with RowSpool(sheet) as spool:
+        spool.write_row(7, [(1, 0, 1)], {})
+        with pytest.raises(ValueError):
+            splice_rows(skeleton_path, sheet.path.lstrip("/"), spool, [], 0, str(tmp_path / "report.xlsx"))
@@ -1,9 +1,25 @@
+from __future__ import annotations
+
 import os
-import win32com.client
-from typing import Optional, List
-from num2words import num2words
+from copy import copy
+from datetime import date
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional, List, Any, Tuple, Iterable
 from pydantic import ValidationError
 from schemas import ChecksDefault, TypeCheck, TypeDocument
+from validation import COLUMN_TITLES, REQUIRED_FIELDS, REQUIRED_BY_TYPE
+from money import to_kopecks, split_kopecks
+from config import LOCATE_DATE, FORMAT_CACHE_SIZE
+
+# openpyxl, babel и num2words импортируются в функциях, которые их используют,
+# чтобы скрипт запускался быстрее
+if TYPE_CHECKING:
+    from babel import Locale
+    from babel.dates import DateTimePattern
+    from openpyxl.styles import Alignment, Border
+    from openpyxl.styles.cell_style import StyleArray
+    from openpyxl.workbook.workbook import Workbook
+    from openpyxl.worksheet.worksheet import Worksheet
 
 
 def validate_check(check: ChecksDefault) -> None:
@@ -18,49 +34,13 @@ def validate_check(check: ChecksDefault) -> None:
     Raises:
         Exception: If a required field is missing for a specific check type.
     """
-    if not check.sum_check or not check.id_check or not check.date:
+    if any(not getattr(check, field) for field in REQUIRED_FIELDS):
         raise Exception("Не заполнены реквизиты чека!")
 
     # Проверка определенного типа
-    if check.type == TypeCheck.representative_offices_event:
-        if not check.counterparty:
-            raise Exception(f"Не заполнено поле 'Контрагент' (Чек ID: {check.id_check})")
-
-        if not check.counterparty_participant:
-            raise Exception(f"Не заполнено поле 'Участник контрагента' (Чек ID: {check.id_check})")
-
-        if not check.counterparty_post:
-            raise Exception(f"Не заполнено поле 'Контрагент должность' (Чек ID: {check.id_check})")
-
-        if not check.meeting_place:
-            raise Exception(f"Не заполнено поле 'Место встречи' (Чек ID: {check.id_check})")
-    elif check.type == TypeCheck.representative_offices_present:
-        if not check.topic:
-            raise Exception(f"Не заполнено поле 'Тема / Мероприятие' (Чек ID: {check.id_check})")
-
-        if not check.counterparty:
-            raise Exception(f"Не заполнено поле 'Контрагент' (Чек ID: {check.id_check})")
-
-        if not check.counterparty_participant:
-            raise Exception(f"Не заполнено поле 'Участник контрагента' (Чек ID: {check.id_check})")
-
-        if not check.name_present:
-            raise Exception(f"Не заполнено поле 'Наименование подарка' (Чек ID: {check.id_check})")
-    elif check.type == TypeCheck.round_table_discussion_Club:
-        if not check.medication:
-            raise Exception(f"Не заполнено поле 'Препарат' (Чек ID: {check.id_check})")
-
-        if not check.counterparty_participant:
-            raise Exception(f"Не заполнено поле 'Участник контрагента' (Чек ID: {check.id_check})")
-
-        if not check.counterparty_post:
-            raise Exception(f"Не заполнено поле 'Контрагент должность' (Чек ID: {check.id_check})")
-
-        if not check.topic:
-            raise Exception(f"Не заполнено поле 'Тема / Мероприятие' (Чек ID: {check.id_check})")
-
-        if not check.meeting_place:
-            raise Exception(f"Не заполнено поле 'Место встречи' (Чек ID: {check.id_check})")
+    for field in REQUIRED_BY_TYPE.get(check.type, ()):
+        if not getattr(check, field):
+            raise Exception(f"Не заполнено поле '{COLUMN_TITLES[field]}' (Чек ID: {check.id_check})")
 
 
 def create_check(check: tuple) -> Optional[ChecksDefault]:
@@ -102,113 +82,84 @@ def create_check(check: tuple) -> Optional[ChecksDefault]:
         return None
 
 
-def create_representative_word(replacements: dict, file_template: str, output_path: str) -> None:
-    """Create a Word document by replacing placeholders with actual values and save it as a PDF.
+@lru_cache(maxsize=FORMAT_CACHE_SIZE)
+def convert_num_to_word(num: int) -> str:
+    """Convert a number to its word representation in Russian.
+
+    The result is cached, amounts and budgets repeat across checks.
 
     Args:
-        replacements (dict): A dictionary where keys are placeholders in the template and values are the actual text to replace them.
-        file_template (str): The name of the Word template file (without path) located in the "templates" directory.
-        output_path (str): The output path (without extension) where the resulting Word document and PDF will be saved.
+        num (int): The number to convert.
 
     Returns:
-        None
-
-    Raises:
-        Exception: If an error occurs during the process, such as issues with file paths or Word application operations.
+        A str, the number in words, capitalized.
     """
-    try:
-        # Создаем объект Word-приложения
-        word_app = win32com.client.Dispatch("Word.Application")
-        word_app.Visible = False  # Открываем приложение в фоновом режиме
-
-        # Открываем документ
-        doc = word_app.Documents.Open(get_absolute_path(f"templates\\{file_template}"))
-
-        # Используем встроенную функцию замены текста
-        for old_text, new_text in replacements.items():
-            find_obj = word_app.Selection.Find
-            find_obj.ClearFormatting()
-            find_obj.Replacement.ClearFormatting()
-            find_obj.Text = old_text
-            find_obj.Replacement.Text = new_text
-            find_obj.Execute(
-                FindText=old_text,
-                MatchCase=False,
-                MatchWholeWord=False,
-                MatchWildcards=False,
-                MatchSoundsLike=False,
-                MatchAllWordForms=False,
-                Forward=True,
-                Wrap=1,
-                Format=False,
-                ReplaceWith=new_text,
-                Replace=2  # wdReplaceAll
-            )
-
-        # Сохраняем изменения в новый файл docx
-        # doc.SaveAs2(get_absolute_path(f"{output_path}.docx"))
-
-        doc.ExportAsFixedFormat(
-            OutputFileName=get_absolute_path(f"{output_path}.pdf"),
-            ExportFormat=17,  # 17 соответствует wdExportFormatPDF
-            OpenAfterExport=False,
-            OptimizeFor=0,  # 0 соответствует wdExportOptimizeForPrint
-            CreateBookmarks=0  # 0 соответствует wdExportCreateNoBookmarks
-        )
+    from num2words import num2words
 
-    except Exception as e:
-        print(f"Ошибка: {e}")
-    finally:
-        try:
-            # Закрываем документ и приложение
-            doc.Close(False)
-            word_app.Quit()
-        except Exception as e:
-            print(f"Ошибка при закрытии документа: {e}")
+    num_word = num2words(num, lang='ru')
+    return num_word.capitalize()
 
 
-def sum_money_all_checks(checks: List[ChecksDefault]) -> float:
-    """Calculate the total sum of all checks.
+@lru_cache(maxsize=FORMAT_CACHE_SIZE)
+def create_kopecks_str(num: float) -> str:
+    """Extract the kopecks part from a monetary amount.
 
     Args:
-        checks (List[ChecksDefault]): A list of ChecksDefault objects.
+        num (float): The monetary amount in rubles and kopecks.
 
     Returns:
-        float: The total sum of all checks.
+        A str, the kopecks part as a string (e.g., "00", "50" or "-50" for a negative amount).
     """
-    sum_checks = 0.0
-    for check in checks:
-        sum_checks += check.sum_check
-    return sum_checks
+    amount = to_kopecks(num)
+    kopecks = split_kopecks(amount)[1]
+    if kopecks == 0:
+        return "00"
+    else:
+        return f"-{kopecks}" if amount < 0 else str(kopecks)
 
 
-def convert_num_to_word(num: int) -> str:
-    """Convert a number to its word representation in Russian.
+@lru_cache(maxsize=None)
+def get_locale() -> Locale:
+    """Get the locale of the dates in the reports, parsed once.
+
+    Returns:
+        Locale: The LOCATE_DATE locale.
+    """
+    from babel import Locale
+
+    return Locale.parse(LOCATE_DATE)
+
+
+@lru_cache(maxsize=None)
+def get_date_pattern(date_format: str) -> DateTimePattern:
+    """Get a compiled babel date pattern.
 
     Args:
-        num (int): The number to convert.
+        date_format (str): The babel date pattern (e.g., "dd MMMM yyyy г.").
 
     Returns:
-        A str, the number in words, capitalized.
+        DateTimePattern: The compiled pattern.
     """
-    num_word = num2words(num, lang='ru')
-    return num_word.capitalize()
+    from babel.dates import parse_pattern
 
+    return parse_pattern(date_format)
 
-def create_kopecks_str(num: float) -> str:
-    """Extract the kopecks part from a monetary amount.
+
+@lru_cache(maxsize=FORMAT_CACHE_SIZE)
+def format_locale_date(value: date, date_format: str) -> str:
+    """Format a date in the LOCATE_DATE locale, the same as babel's format_date.
+
+    The locale and the pattern are prepared once, and the result is cached since
+    the checks of a report share a few dates.
 
     Args:
-        num (float): The monetary amount in rubles and kopecks.
+        value (date): The date to format.
+        date_format (str): The babel date pattern (e.g., "dd MMMM yyyy г.").
 
     Returns:
-        A str, the kopecks part as a string (e.g., "00" or "50").
+        str: The formatted date.
     """
-    kopecks = (num - int(num)) * 100
-    if kopecks == 0:
-        return "00"
-    else:
-        return f"{kopecks:.0f}"
+    return get_date_pattern(date_format).apply(value, get_locale())
 
 
 def create_text_price(rubles: int, kopecks: int) -> str:
@@ -238,4 +189,128 @@ def get_absolute_path(relative_path: str) -> str:
         str: The absolute path to the file.
     """
     script_dir = os.path.dirname(os.path.abspath(__file__))
-    return os.path.join(script_dir, relative_path)
\ No newline at end of file
+    return os.path.join(script_dir, relative_path)
+
+
+def get_row_value(rows: List[tuple], coordinate: str) -> Any:
+    """Get a cell value by its coordinate from rows read with values_only=True.
+
+    Args:
+        rows (List[tuple]): The rows of the sheet starting from the first one.
+        coordinate (str): The cell coordinate (e.g., "C1").
+
+    Returns:
+        Any: The value of the cell, or None if the cell is outside the read rows.
+    """
+    from openpyxl.utils.cell import coordinate_to_tuple
+
+    row_idx, col_idx = coordinate_to_tuple(coordinate)
+    if row_idx > len(rows) or col_idx > len(rows[row_idx - 1]):
+        return None
+    return rows[row_idx - 1][col_idx - 1]
+
+
+def cut_rows(sheet: Worksheet, min_row: int) -> List[Tuple[int, int, Any, Any]]:
+    """Remove all rows starting from min_row and return their cells.
+
+    Row heights are left in place, the same way openpyxl's insert_rows does.
+
+    Args:
+        sheet (Worksheet): The sheet to cut the rows from.
+        min_row (int): The first row to cut.
+
+    Returns:
+        List[Tuple[int, int, Any, Any]]: The cut cells as (row offset from min_row, column, value, style).
+    """
+    cells = [
+        (cell.row - min_row, cell.column, cell.value, copy(cell._style))
+        for row in sheet.iter_rows(min_row=min_row)
+        for cell in row
+        if cell.has_style or cell.value is not None
+    ]
+    if sheet.max_row >= min_row:
+        sheet.delete_rows(min_row, sheet.max_row - min_row + 1)
+    return cells
+
+
+def paste_rows(sheet: Worksheet, min_row: int, cells: List[Tuple[int, int, Any, Any]]) -> None:
+    """Put cells cut with cut_rows back into the sheet starting from min_row.
+
+    Args:
+        sheet (Worksheet): The sheet to paste the cells into.
+        min_row (int): The row where the first cut row is placed.
+        cells (List[Tuple[int, int, Any, Any]]): The cells returned by cut_rows.
+
+    Returns:
+        None
+    """
+    for row_offset, column, value, style in cells:
+        cell = sheet.cell(row=min_row + row_offset, column=column, value=value)
+        cell._style = copy(style)
+
+
+def merge_new_cells(sheet: Worksheet, ranges: Iterable[str]) -> None:
+    """Merge cell ranges that do not overlap any existing merged range.
+
+    Worksheet.merge_cells compares every new range with all merged ranges of the
+    sheet, which makes merging a row per check quadratic. The ranges passed here
+    are known to be new, so they are added without that check. The cells are
+    replaced through Worksheet._cells, as merge_cells does in openpyxl 3.1
+    (the version pinned in requirements.txt).
+
+    Args:
+        sheet (Worksheet): The sheet to merge the cells in.
+        ranges (Iterable[str]): The cell ranges to merge (e.g., "B66:C66").
+
+    Returns:
+        None
+    """
+    from openpyxl.worksheet.merge import MergedCellRange, MergedCell
+
+    for range_string in ranges:
+        merged_range = MergedCellRange(sheet, range_string)
+        sheet.merged_cells.ranges.add(merged_range)
+
+        cells = merged_range.cells
+        next(cells)  # первая ячейка остается обычной
+        for row, col in cells:
+            sheet._cells[row, col] = MergedCell(sheet, row, col)
+
+        # Перенос границ нужен, только если у первой ячейки уже есть стиль
+        if merged_range.start_cell.has_style:
+            merged_range.format()
+
+
+def make_style(workbook: Workbook, border: Optional[Border] = None, alignment: Optional[Alignment] = None,
+               number_format: Optional[str] = None) -> StyleArray:
+    """Register style parts in the workbook once and build a cell style that refers to them.
+
+    Assigning cell.border, cell.alignment or cell.number_format looks the value
+    up in the style lists of the workbook on every call. The returned style is
+    built with a single lookup per part and can be copied to any number of cells.
+    The parts are added to the private style lists of the workbook the way the
+    cell setters of openpyxl 3.1 add them.
+
+    Args:
+        workbook (Workbook): The workbook the style belongs to.
+        border (Optional[Border]): The border of the cell.
+        alignment (Optional[Alignment]): The alignment of the cell.
+        number_format (Optional[str]): The number format of the cell.
+
+    Returns:
+        StyleArray: The cell style, to be copied into cell._style.
+    """
+    from openpyxl.styles.cell_style import StyleArray
+    from openpyxl.styles.numbers import BUILTIN_FORMATS_MAX_SIZE, BUILTIN_FORMATS_REVERSE
+
+    style = StyleArray()
+    if border is not None:
+        style.borderId = workbook._borders.add(border)
+    if alignment is not None:
+        style.alignmentId = workbook._alignments.add(alignment)
+    if number_format is not None:
+        if number_format in BUILTIN_FORMATS_REVERSE:
+            style.numFmtId = BUILTIN_FORMATS_REVERSE[number_format]
+        else:
+            style.numFmtId = workbook._number_formats.add(number_format) + BUILTIN_FORMATS_MAX_SIZE
+    return style
@@ -0,0 +1,331 @@
+from datetime import date, datetime, time
+from itertools import compress
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from schemas import TypeCheck, TypeDocument, RowError
+from config import START_ROW_READ, VALIDATION_CHUNK_SIZE
+
+
+# Столбцы блока чеков во входном файле: поле ChecksDefault и заголовок столбца
+CHECK_COLUMNS = (
+    ("number_str", "№ п/п"),
+    ("type_document", "Тип документа"),
+    ("id_check", "Номер чека"),
+    ("date", "Дата чека"),
+    ("sum_check", "Сумма"),
+    ("type", "Тип расходов"),
+    ("counterparty", "Контрагент"),
+    ("counterparty_participant", "Участник контрагента"),
+    ("counterparty_post", "Контрагент должность"),
+    ("meeting_place", "Место встречи"),
+    ("medication", "Препарат"),
+    ("topic", "Тема / Мероприятие"),
+    ("name_present", "Наименование подарка"),
+    ("comment", "Комментарии"),
+)
+COLUMN_TITLES = dict(CHECK_COLUMNS)
+COLUMN_ORDER = {field: idx for idx, (field, _) in enumerate(CHECK_COLUMNS)}
+
+# Другие варианты заголовков столбцов
+COLUMN_ALIASES = {
+    "number_str": ("№", "№ п.п.", "номер п/п", "номер строки", "№ строки"),
+    "type_document": ("документ", "вид документа"),
+    "id_check": ("№ чека", "номер документа", "№ документа"),
+    "date": ("дата документа",),
+    "sum_check": ("сумма чека", "сумма, руб.", "сумма, руб", "сумма руб."),
+    "type": ("вид расходов", "статья расходов", "тип расхода"),
+    "counterparty": ("организация", "контрагент (организация)"),
+    "counterparty_participant": ("участники контрагента", "участник", "участники"),
+    "counterparty_post": ("должность контрагента", "должность участника"),
+    "meeting_place": ("место проведения",),
+    "medication": ("препараты",),
+    "topic": ("тема", "мероприятие"),
+    "name_present": ("подарок", "подарки", "наименование подарков"),
+    "comment": ("комментарий", "примечание", "примечания"),
+}
+
+# Столбцы, по которым строка считается чеком; строки без них (пустые, пояснения под таблицей) пропускаются
+KEY_FIELDS = ("number_str", "type_document", "id_check", "date", "sum_check", "type")
+
+
+def normalize_title(title: Any) -> str:
+    """Bring a column title to the form used to look it up.
+
+    Args:
+        title (Any): The value of a header cell.
+
+    Returns:
+        str: The title in lower case with single spaces, "ё" replaced with "е" and no spaces around "/".
+    """
+    text = " ".join(str(title).lower().replace("ё", "е").split())
+    return text.replace(" / ", "/").replace(" /", "/").replace("/ ", "/").rstrip(":")
+
+
+TITLE_INDEX = {
+    normalize_title(title): field
+    for field, titles in ((field, (title,) + COLUMN_ALIASES.get(field, ())) for field, title in CHECK_COLUMNS)
+    for title in titles
+}
+
+
+def map_columns(header: Iterable[Any]) -> Tuple[Optional[int], ...]:
+    """Find the columns of the check fields by the titles of the header row.
+
+    A title must match a title of CHECK_COLUMNS or COLUMN_ALIASES as a whole.
+    Columns can be in any order, unknown columns are ignored. If no title is
+    recognized, the fixed layout of the template is used.
+
+    Args:
+        header (Iterable[Any]): The values of the header row.
+
+    Returns:
+        Tuple[Optional[int], ...]: The 0-based column of every field in CHECK_COLUMNS order, None if it is absent.
+
+    Raises:
+        ValueError: If several columns have titles of the same field.
+    """
+    header_titles = list(header)
+    found: Dict[str, int] = {}
+    for idx, title in enumerate(header_titles):
+        if title is None:
+            continue
+        field = TITLE_INDEX.get(normalize_title(title))
+        if field is None:
+            continue
+        if field in found:
+            raise ValueError(f"Несколько столбцов подходят для поля '{COLUMN_TITLES[field]}': "
+                             f"{header_titles[found[field]]!r} и {title!r}")
+        found[field] = idx
+
+    if not found:
+        print("Заголовки столбцов не распознаны, используется порядок столбцов шаблона")
+        return tuple(range(len(CHECK_COLUMNS)))
+
+    missing = [title for field, title in CHECK_COLUMNS if field not in found]
+    if missing:
+        print(f"Во входном файле нет столбцов: {', '.join(missing)}")
+    return tuple(found.get(field) for field, _ in CHECK_COLUMNS)
+
+
+def select_columns(rows: Iterable[tuple], columns: Tuple[Optional[int], ...],
+                   first_row: int = START_ROW_READ) -> Iterator[Tuple[int, tuple]]:
+    """Lazily take the check fields out of the rows, skipping the rows that are not checks.
+
+    Args:
+        rows (Iterable[tuple]): The rows starting from first_row as tuples of cell values.
+        columns (Tuple[Optional[int], ...]): The columns of the fields returned by map_columns.
+        first_row (int): The number of the first row in the sheet.
+
+    Yields:
+        Tuple[int, tuple]: The number of the row in the sheet and its values in CHECK_COLUMNS order.
+    """
+    key_columns = [columns[COLUMN_ORDER[field]] for field in KEY_FIELDS if columns[COLUMN_ORDER[field]] is not None]
+    for row_number, row in enumerate(rows, start=first_row):
+        width = len(row)
+        if all(idx >= width or row[idx] is None for idx in key_columns):
+            continue
+        yield row_number, tuple(row[idx] if idx is not None and idx < width else None for idx in columns)
+
+
+# Реквизиты, обязательные для всех чеков
+REQUIRED_FIELDS = ("sum_check", "id_check", "date")
+
+# Поля, обязательные для определенного типа чека
+REQUIRED_BY_TYPE = {
+    TypeCheck.representative_offices_event: ("counterparty", "counterparty_participant", "counterparty_post",
+                                             "meeting_place"),
+    TypeCheck.representative_offices_present: ("topic", "counterparty", "counterparty_participant", "name_present"),
+    TypeCheck.round_table_discussion_Club: ("medication", "counterparty_participant", "counterparty_post", "topic",
+                                            "meeting_place"),
+}
+
+
+def parse_date(value: Any) -> Any:
+    """Convert a date cell the way the Optional[date] field of ChecksDefault does."""
+    if isinstance(value, datetime):
+        if value.time() != time():
+            raise ValueError(value)
+        return value.date()
+    if value is None or isinstance(value, date):
+        return value
+    return date.fromisoformat(value)
+
+
+def parse_int_or_str(value: Any) -> Any:
+    """Convert a cell the way an Optional[Union[int, str]] field of ChecksDefault does."""
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, float):
+        if not value.is_integer():
+            raise ValueError(value)
+        return int(value)
+    return int(value)
+
+
+def parse_text(value: Any) -> Any:
+    """Accept a cell the way an Optional[str] field of ChecksDefault does."""
+    if value is None or isinstance(value, str):
+        return value
+    raise ValueError(value)
+
+
+# Преобразования значений столбцов: те же, что делают create_check и ChecksDefault,
+# поэтому из прошедших проверку строк чеки создаются без pydantic
+PARSERS: Dict[str, Callable[[Any], Any]] = {
+    "number_str": int,
+    "type_document": lambda value: TypeDocument(value.strip()),
+    "id_check": parse_int_or_str,
+    "date": parse_date,
+    "sum_check": float,
+    "type": lambda value: TypeCheck(value.lower().strip()),
+    "counterparty": parse_text,
+    "counterparty_participant": parse_int_or_str,
+    "counterparty_post": parse_text,
+    "meeting_place": parse_text,
+    "medication": parse_text,
+    "topic": parse_text,
+    "name_present": parse_text,
+    "comment": parse_text,
+}
+
+
+def to_columns(rows: List[tuple]) -> Dict[str, List[Any]]:
+    """Turn check rows into columns of the CHECK_COLUMNS fields.
+
+    Args:
+        rows (List[tuple]): The check rows as tuples of cell values, short rows are padded with None.
+
+    Returns:
+        Dict[str, List[Any]]: The values of every field, one per row.
+    """
+    width = len(CHECK_COLUMNS)
+    padded = (row[:width] + (None,) * (width - len(row)) for row in rows)
+    columns = list(zip(*padded)) or [()] * width
+    return {field: list(values) for (field, _), values in zip(CHECK_COLUMNS, columns)}
+
+
+def parse_column(values: List[Any], parser: Callable[[Any], Any]) -> Tuple[List[Any], List[bool]]:
+    """Convert a column, marking the values that cannot be converted.
+
+    Args:
+        values (List[Any]): The values of the column.
+        parser (Callable[[Any], Any]): The conversion of a single value.
+
+    Returns:
+        Tuple[List[Any], List[bool]]: The converted values (None where the conversion failed) and the mask of failed values.
+    """
+    parsed = []
+    invalid = []
+    for value in values:
+        try:
+            parsed.append(parser(value))
+            invalid.append(False)
+        except Exception:
+            parsed.append(None)
+            invalid.append(True)
+    return parsed, invalid
+
+
+def missing_mask(values: List[Any]) -> List[bool]:
+    """Mark the empty values of a column, the same way validate_check treats them.
+
+    Args:
+        values (List[Any]): The values of the column.
+
+    Returns:
+        List[bool]: True for every empty value.
+    """
+    return [not value for value in values]
+
+
+def validate_block(rows: List[tuple], row_numbers: List[int]) -> Tuple[List[tuple], List[RowError]]:
+    """Validate a block of check rows column by column and collect every problem.
+
+    Every rule is applied to a whole column at once, so a row with several
+    problems reports all of them instead of the first one.
+
+    Args:
+        rows (List[tuple]): The check rows as tuples of cell values in CHECK_COLUMNS order.
+        row_numbers (List[int]): The numbers of the rows in the sheet, used in the errors.
+
+    Returns:
+        Tuple[List[tuple], List[RowError]]: The converted values of the valid rows in CHECK_COLUMNS order
+            and the errors sorted by row and column.
+    """
+    columns = to_columns(rows)
+    found: List[Tuple[int, str, str]] = []
+
+    def add_errors(mask: Iterable[bool], field: str, message: str) -> None:
+        for idx in compress(range(len(rows)), mask):
+            found.append((idx, field, message))
+
+    parsed = {}
+    for field, parser in PARSERS.items():
+        parsed[field], invalid = parse_column(columns[field], parser)
+        # Пустые значения отмечаются как незаполненные, а не как неверные
+        missing = missing_mask(columns[field])
+        add_errors((bad and not empty for bad, empty in zip(invalid, missing)),
+                   field, f"Неверное значение поля '{COLUMN_TITLES[field]}'")
+        if field not in REQUIRED_FIELDS:
+            add_errors((bad and empty for bad, empty in zip(invalid, missing)),
+                       field, f"Не заполнено поле '{COLUMN_TITLES[field]}'")
+
+    for field in REQUIRED_FIELDS:
+        add_errors(missing_mask(columns[field]), field, f"Не заполнено поле '{COLUMN_TITLES[field]}'")
+
+    types = parsed["type"]
+    for type_check, fields in REQUIRED_BY_TYPE.items():
+        type_mask = [value == type_check for value in types]
+        if not any(type_mask):
+            continue
+        for field in fields:
+            mask = (is_type and empty for is_type, empty in zip(type_mask, missing_mask(columns[field])))
+            add_errors(mask, field, f"Не заполнено поле '{COLUMN_TITLES[field]}'")
+
+    valid = [True] * len(rows)
+    for idx, _, _ in found:
+        valid[idx] = False
+    values = list(compress(zip(*(parsed[field] for field, _ in CHECK_COLUMNS)), valid))
+
+    found.sort(key=lambda error: (error[0], COLUMN_ORDER[error[1]]))
+    ids = columns["id_check"]
+    errors = [
+        RowError(
+            row=row_numbers[idx],
+            id_check=None if ids[idx] is None else str(ids[idx]),
+            field=COLUMN_TITLES[field],
+            message=message,
+        )
+        for idx, field, message in found
+    ]
+    return values, errors
+
+
+def validate_rows(rows: Iterable[Tuple[int, tuple]], errors: List[RowError],
+                  chunk_size: int = VALIDATION_CHUNK_SIZE) -> Iterator[tuple]:
+    """Lazily validate check rows by blocks, passing on the converted values of the valid ones.
+
+    Args:
+        rows (Iterable[Tuple[int, tuple]]): The numbers of the rows in the sheet and their values
+            in CHECK_COLUMNS order, as returned by select_columns.
+        errors (List[RowError]): The list the errors of all rows are added to.
+        chunk_size (int): The number of rows validated at once.
+
+    Yields:
+        tuple: The values of every row without errors in CHECK_COLUMNS order, ready for CheckRecord.
+    """
+    row_numbers: List[int] = []
+    chunk: List[tuple] = []
+    for row_number, row in rows:
+        row_numbers.append(row_number)
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            values, chunk_errors = validate_block(chunk, row_numbers)
+            errors.extend(chunk_errors)
+            yield from values
+            row_numbers = []
+            chunk = []
+
+    if chunk:
+        values, chunk_errors = validate_block(chunk, row_numbers)
+        errors.extend(chunk_errors)
+        yield from values
@@ -0,0 +1,218 @@
+import io
+import re
+import shutil
+import tempfile
+import zipfile
+from typing import Any, Dict, Iterable, Optional, Tuple
+from xml.sax.saxutils import escape, quoteattr
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.compat import safe_string
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.worksheet import Worksheet
+
+
+ROW_START = re.compile(r'<row r="(\d+)"')
+MERGE_CELLS = re.compile(r'<mergeCells count="(\d+)"\s*>')
+SHEET_DATA_END = '</sheetData>'
+MERGE_CELLS_END = '</mergeCells>'
+# Ячейка с формулой без значения, как ее записывает openpyxl
+EMPTY_FORMULA_CELL = re.compile(r'<c r="([A-Z]+\d+)"([^>]*)><f>([^<]*)</f><v\s*/>')
+
+# Размер блока при копировании строк во временном файле
+COPY_BUFFER_SIZE = 1 << 16
+
+
+class CachedFormula:
+    """A formula of a cell together with its value computed when the report is written.
+
+    Excel shows the value without recalculating the workbook on open.
+    """
+
+    __slots__ = ("formula", "value")
+
+    def __init__(self, formula: str, value: Any) -> None:
+        """
+        Args:
+            formula (str): The formula without the leading "=" (e.g., "SUM(L66:L70)").
+            value (Any): The value of the formula.
+        """
+        self.formula = formula
+        self.value = value
+
+
+def fill_cached_values(xml: str, values: Dict[str, Any]) -> str:
+    """Add the values to the formula cells of a sheet saved by openpyxl.
+
+    Args:
+        xml (str): The XML of the sheet.
+        values (Dict[str, Any]): The values of the formulas by cell reference (e.g., "L84").
+
+    Returns:
+        str: The XML with the values of the formulas.
+    """
+    def fill(match: re.Match) -> str:
+        ref = match.group(1)
+        if ref not in values:
+            return match.group(0)
+        return f'<c r="{ref}"{match.group(2)}><f>{match.group(3)}</f><v>{escape(safe_string(values[ref]))}</v>'
+
+    return EMPTY_FORMULA_CELL.sub(fill, xml) if values else xml
+
+
+class RowSpool:
+    """Rows of a worksheet written as SpreadsheetML to a temporary file.
+
+    The rows are kept on disk, so their number does not affect memory. The
+    cells are converted the same way openpyxl converts them when it saves a
+    worksheet, so the spooled rows can be spliced into a sheet saved by it.
+    """
+
+    def __init__(self, sheet: Worksheet) -> None:
+        """
+        Args:
+            sheet (Worksheet): The worksheet the rows belong to, used to convert the values.
+        """
+        self.sheet = sheet
+        self.file = tempfile.TemporaryFile(mode="w+", encoding="utf-8")
+        self.first_row: Optional[int] = None
+        self.last_row: Optional[int] = None
+
+    def cell_xml(self, row: int, column: int, style_id: int, value: Any) -> str:
+        """Convert a cell to SpreadsheetML.
+
+        Args:
+            row (int): The row of the cell.
+            column (int): The column of the cell.
+            style_id (int): The index of the cell style in the workbook.
+            value (Any): The value of the cell.
+
+        Returns:
+            str: The <c> element of the cell.
+        """
+        ref = f"{get_column_letter(column)}{row}"
+        if value is None:
+            return f'<c r="{ref}" s="{style_id}" t="n"/>'
+        if isinstance(value, CachedFormula):
+            return (f'<c r="{ref}" s="{style_id}"><f>{escape(value.formula)}</f>'
+                    f'<v>{escape(safe_string(value.value))}</v></c>')
+
+        cell = WriteOnlyCell(self.sheet, value)  # проверяет значение и определяет его тип
+        value = cell.value
+        if cell.data_type == "s":
+            space = ' xml:space="preserve"' if value.strip() and value != value.strip() else ''
+            return f'<c r="{ref}" s="{style_id}" t="inlineStr"><is><t{space}>{escape(value)}</t></is></c>'
+        if cell.data_type == "f":
+            return f'<c r="{ref}" s="{style_id}"><f>{escape(value[1:])}</f><v></v></c>'
+        return f'<c r="{ref}" s="{style_id}" t="{cell.data_type}"><v>{escape(safe_string(value))}</v></c>'
+
+    def write_row(self, row: int, cells: Iterable[Tuple[int, int, Any]], attributes: Dict[str, str]) -> None:
+        """Add a row after the previous ones.
+
+        Args:
+            row (int): The number of the row.
+            cells (Iterable[Tuple[int, int, Any]]): The cells as (column, style index, value), ordered by column.
+            attributes (Dict[str, str]): The attributes of the <row> element besides "r" (height, style).
+
+        Returns:
+            None
+        """
+        if self.first_row is None:
+            self.first_row = row
+        self.last_row = row
+
+        attrs = "".join(f" {name}={quoteattr(value)}" for name, value in attributes.items())
+        self.file.write(f'<row r="{row}"{attrs}>')
+        for column, style_id, value in cells:
+            self.file.write(self.cell_xml(row, column, style_id, value))
+        self.file.write('</row>')
+
+    def copy_to(self, output) -> None:
+        """Copy the spooled rows to a text stream.
+
+        Args:
+            output: The text stream to write to.
+
+        Returns:
+            None
+        """
+        self.file.flush()
+        self.file.seek(0)
+        shutil.copyfileobj(self.file, output, COPY_BUFFER_SIZE)
+
+    def close(self) -> None:
+        """Remove the temporary file."""
+        self.file.close()
+
+    def __enter__(self) -> "RowSpool":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+
+def splice_rows(workbook_path: str, sheet_part: str, spool: Optional[RowSpool], merges: Iterable[str],
+                count_merges: int, output_path: str, cached: Optional[Dict[str, Any]] = None) -> None:
+    """Write a copy of a saved workbook with spooled rows and merged ranges added to one sheet.
+
+    The sheet must have no rows in the range of the spooled rows: they are
+    inserted before the first row below them, and the merged ranges are added
+    to the existing <mergeCells>, so the sheet must already have merged cells.
+    Both are streamed into the new file. The values of the formulas saved by
+    openpyxl can be added at the same time.
+
+    Args:
+        workbook_path (str): The path to the workbook saved by openpyxl.
+        sheet_part (str): The name of the sheet part in the package (e.g., "xl/worksheets/sheet1.xml").
+        spool (Optional[RowSpool]): The rows to insert, None to insert no rows.
+        merges (Iterable[str]): The merged ranges to add (e.g., "B66:C66").
+        count_merges (int): The number of the merged ranges.
+        output_path (str): The path of the resulting workbook.
+        cached (Optional[Dict[str, Any]]): The values of the formulas of the sheet by cell reference.
+
+    Returns:
+        None
+
+    Raises:
+        ValueError: If the sheet already has rows in the range of the spooled rows or has no merged cells.
+    """
+    if spool is not None and spool.first_row is None:
+        spool = None
+
+    with zipfile.ZipFile(workbook_path) as source, \
+            zipfile.ZipFile(output_path, "w", zipfile.ZIP_DEFLATED) as target:
+        for item in source.infolist():
+            if item.filename != sheet_part or (spool is None and not cached):
+                target.writestr(item, source.read(item.filename))
+                continue
+
+            xml = fill_cached_values(source.read(item.filename).decode("utf-8"), cached)
+            if spool is None:
+                target.writestr(item, xml.encode("utf-8"))
+                continue
+
+            rows_end = xml.index(SHEET_DATA_END)
+            insert_at = rows_end
+            for match in ROW_START.finditer(xml, 0, rows_end):
+                row = int(match.group(1))
+                if spool.first_row <= row <= spool.last_row:
+                    raise ValueError(f"Строка {row} уже есть на листе")
+                if row > spool.last_row:
+                    insert_at = match.start()
+                    break
+
+            merge_match = MERGE_CELLS.search(xml, rows_end)
+            if merge_match is None:
+                raise ValueError(f"На листе {sheet_part} нет объединенных ячеек")
+            merges_end = xml.index(MERGE_CELLS_END, merge_match.end())
+
+            info = zipfile.ZipInfo(item.filename, item.date_time)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            with target.open(info, "w", force_zip64=True) as part, io.TextIOWrapper(part, encoding="utf-8") as text:
+                text.write(xml[:insert_at])
+                spool.copy_to(text)
+                text.write(xml[insert_at:merge_match.start()])
+                text.write(f'<mergeCells count="{int(merge_match.group(1)) + count_merges}">')
+                text.write(xml[merge_match.end():merges_end])
+                for ref in merges:
+                    text.write(f'<mergeCell ref="{ref}"/>')
+                text.write(xml[merges_end:])